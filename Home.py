@@ -3,10 +3,31 @@ import pandas as pd
 import sqlite3
 import hashlib
 import pyotp
-from datetime import datetime
-from contextlib import closing
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 from fpdf import FPDF
 from sklearn.linear_model import LinearRegression
+from notifications import NotificationWorker, SmtpSender, enqueue_notification
+from student_search import StudentSearchIndex
+from published_results import (
+    HISTORY_COLUMNS, RESULT_COLUMNS, get_current_snapshot, load_snapshot, load_snapshot_history, publish_term,
+    unpublish
+)
+from report_data import MEETING_FIELDS, fetch_meeting_requests, fetch_student_info, fetch_student_report
+from tenancy import DEFAULT_SCHOOL, ShardRegistry, current_school, valid_school_id
+from export_reports import EXPORT_COLUMNS, export_reports_csv, export_reports_parquet
+from archive_reports import (
+    archive_path, archive_reports, cutoff_for_keep_years, iter_archived_reports, list_archive_years
+)
+from backup import BackupScheduler, DATABASES, list_snapshots, snapshot_school
+from marks_audit import describe_change, query_marks_audit, record_marks_changes
+from schema import init_shard
+from meeting_scheduler import (
+    SLOT_TIME_FORMAT, add_slots, get_teacher_slots, invalidate_slot_index, release_slots, request_meeting
+)
 
 # Mobile-friendly page configuration
 st.set_page_config(
@@ -53,109 +74,46 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def upgrade_database():
-    """Handle database schema upgrades"""
-    with closing(sqlite3.connect("users.db")) as conn:
-        cursor = conn.cursor()
-        
-        # Check if is_admin column exists in teachers table
-        cursor.execute("PRAGMA table_info(teachers)")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'is_admin' not in columns:
-            # Add the column if it doesn't exist
-            cursor.execute("ALTER TABLE teachers ADD COLUMN is_admin BOOLEAN DEFAULT 0")
-            # Update existing admin account
-            cursor.execute(
-                "UPDATE teachers SET is_admin = 1 WHERE username = ?",
-                ("Lam",)
-            )
-            conn.commit()
+@st.cache_resource
+def get_shard_registry():
+    """One registry of open school databases per app process"""
+    return ShardRegistry(on_open=init_shard)
 
-# Initialize databases
-def init_db():
-    with closing(sqlite3.connect("reports.db")) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            roll_no TEXT NOT NULL,
-            class TEXT NOT NULL,
-            section TEXT NOT NULL,
-            tamil INTEGER NOT NULL,
-            english INTEGER NOT NULL,
-            maths INTEGER NOT NULL,
-            science INTEGER NOT NULL,
-            social INTEGER NOT NULL,
-            computer INTEGER NOT NULL,
-            total INTEGER NOT NULL,
-            percentage REAL NOT NULL,
-            grade TEXT NOT NULL,
-            timestamp TEXT NOT NULL
-        )
-        """)
-        conn.commit()
-    
-    with closing(sqlite3.connect("users.db")) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS teachers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            is_admin BOOLEAN DEFAULT 0
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS students (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            roll_no TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            class TEXT NOT NULL,
-            section TEXT NOT NULL,
-            created_at TEXT NOT NULL
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS parent_accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_roll_no TEXT UNIQUE NOT NULL,
-            parent_email TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            FOREIGN KEY(student_roll_no) REFERENCES students(roll_no)
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS meeting_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            roll_no TEXT NOT NULL,
-            meeting_date TEXT NOT NULL,
-            requested_at TEXT NOT NULL,
-            status TEXT DEFAULT 'Pending',
-            teacher_notes TEXT,
-            approval_timestamp TEXT,
-            teacher_username TEXT
-        )
-        """)
-        cursor.execute("SELECT 1 FROM teachers WHERE username=?", ("Lam",))
-        if not cursor.fetchone():
-            hashed_password = hashlib.sha256("Lam123".encode()).hexdigest()
-            cursor.execute(
-                "INSERT INTO teachers (username, password, full_name, created_at, is_admin) VALUES (?, ?, ?, ?, ?)",
-                ("Lam", hashed_password, "Admin Teacher", datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 1)
-            )
-            conn.commit()
+shard_registry = get_shard_registry()
+
+def current_shard():
+    return shard_registry.get(current_school.get())
+
+def users_connection():
+    return current_shard().users.connection()
+
+def reports_connection():
+    return current_shard().reports.connection()
 
-# Initialize database and handle upgrades
-init_db()
-upgrade_database()
+@st.cache_resource
+def start_notification_worker():
+    """Start one outbox worker per app process"""
+    worker = NotificationWorker(shard_registry.users_db_paths, SmtpSender.from_env())
+    if os.environ.get("NOTIFICATION_WORKER") != "external":
+        worker.start()
+    return worker
+
+notification_worker = start_notification_worker()
+
+@st.cache_resource
+def start_backup_scheduler():
+    """Snapshot every school's databases every BACKUP_INTERVAL_HOURS (0 disables)"""
+    hours = float(os.environ.get("BACKUP_INTERVAL_HOURS", "24"))
+    scheduler = BackupScheduler(hours * 3600, shard_registry, keep=int(os.environ.get("BACKUP_KEEP", "7")))
+    if hours > 0:
+        scheduler.start()
+    return scheduler
+
+backup_scheduler = start_backup_scheduler()
 
 # Helper functions
 def validate_parent_email(roll_no, email):
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT 1 FROM parent_accounts WHERE student_roll_no=? AND parent_email=?",
@@ -164,34 +122,10 @@ def validate_parent_email(roll_no, email):
         return cursor.fetchone() is not None
 
 def get_student_info(roll_no):
-    with closing(sqlite3.connect("users.db")) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT roll_no, full_name, class, section FROM students WHERE roll_no=?",
-            (roll_no,)
-        )
-        row = cursor.fetchone()
-        if row:
-            return {
-                "roll_no": row[0],
-                "full_name": row[1],
-                "class": row[2],
-                "section": row[3]
-            }
-        return {}
-
-def update_meeting_request_status(request_id, status, teacher_notes=""):
-    with closing(sqlite3.connect("users.db")) as conn:
-        cursor = conn.cursor()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cursor.execute(
-            "UPDATE meeting_requests SET status=?, teacher_notes=?, approval_timestamp=? WHERE id=?",
-            (status, teacher_notes, timestamp, request_id)
-        )
-        conn.commit()
+    return fetch_student_info(current_shard(), roll_no)
 
 def get_single_student_meeting_request(roll_no):
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         df = pd.read_sql("""
         SELECT
             meeting_date as "Preferred Date",
@@ -206,42 +140,80 @@ def get_single_student_meeting_request(roll_no):
         """, conn, params=(roll_no,))
     return df
 
-def get_meeting_requests(teacher_username=None):
-    with closing(sqlite3.connect("users.db")) as conn:
-        if teacher_username:
-            df = pd.read_sql("""
-                SELECT
-                    mr.id,
-                    mr.roll_no as "Student Roll No",
-                    s.full_name as "Student Name",
-                    mr.meeting_date as "Preferred Date",
-                    mr.requested_at as "Requested At",
-                    mr.status as "Status",
-                    mr.teacher_notes as "Teacher Notes"
-                FROM meeting_requests mr
-                JOIN students s ON mr.roll_no = s.roll_no
-                WHERE mr.teacher_username = ?
-                ORDER BY mr.requested_at DESC
-            """, conn, params=(teacher_username,))
-        else:
-            df = pd.read_sql("""
-                SELECT
-                    mr.id,
-                    mr.roll_no as "Student Roll No",
-                    s.full_name as "Student Name",
-                    mr.meeting_date as "Preferred Date",
-                    mr.requested_at as "Requested At",
-                    mr.status as "Status",
-                    mr.teacher_notes as "Teacher Notes"
-                FROM meeting_requests mr
-                JOIN students s ON mr.roll_no = s.roll_no
-                ORDER BY mr.requested_at DESC
-            """, conn)
-    return df
+def get_meeting_requests(teacher_username=None, status=None, exclude_status=None, limit=None, offset=0):
+    rows = fetch_meeting_requests(current_shard(), teacher_username, status, exclude_status, limit, offset)
+    return pd.DataFrame(rows, columns=MEETING_FIELDS).rename(columns={
+        "roll_no": "Student Roll No",
+        "student_name": "Student Name",
+        "meeting_date": "Preferred Date",
+        "requested_at": "Requested At",
+        "status": "Status",
+        "teacher_notes": "Teacher Notes"
+    })
+
+def get_meeting_request_counts(teacher_username):
+    """Return a {status: count} dict of a teacher's meeting requests"""
+    with users_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT status, COUNT(*) FROM meeting_requests WHERE teacher_username=? GROUP BY status",
+            (teacher_username,)
+        )
+        return dict(cursor.fetchall())
+
+def update_meeting_requests_status(request_ids, status, teacher_notes=""):
+    """Approve or reject several pending meeting requests in one transaction.
+
+    Requests that are no longer pending (e.g. reviewed from another tab) are
+    left alone; their ids are returned.
+    """
+    request_ids = [int(request_id) for request_id in request_ids]
+    placeholders = ", ".join("?" for _ in request_ids)
+    with users_connection() as conn:
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        released = set()
+        notified = []
+        with conn:
+            # Lock before reading statuses so nobody reviews them in between
+            cursor = conn.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                f"SELECT id FROM meeting_requests WHERE id IN ({placeholders}) AND status='Pending'",
+                request_ids
+            )
+            pending = [row[0] for row in cursor.fetchall()]
+            if pending:
+                if status == "Rejected":
+                    # Rejected requests give their place in the slot back
+                    released = release_slots(cursor, pending)
+                cursor.executemany(
+                    "UPDATE meeting_requests SET status=?, teacher_notes=?, approval_timestamp=? WHERE id=? AND status='Pending'",
+                    [(status, teacher_notes, timestamp, request_id) for request_id in pending]
+                )
+                cursor.execute(f"""
+                    SELECT pa.parent_email, mr.roll_no, mr.meeting_date
+                    FROM meeting_requests mr
+                    JOIN parent_accounts pa ON pa.student_roll_no = mr.roll_no
+                    WHERE mr.id IN ({", ".join("?" for _ in pending)})
+                """, pending)
+                notified = cursor.fetchall()
+            for parent_email, roll_no, meeting_date in notified:
+                enqueue_notification(
+                    cursor,
+                    parent_email,
+                    f"Meeting request {status.lower()}",
+                    f"Your meeting request for {meeting_date} (Roll No {roll_no}) was {status.lower()}.\n\n"
+                    f"Teacher notes: {teacher_notes or 'None'}"
+                )
+        if notified:
+            notification_worker.wake()
+        for teacher_username in released:
+            invalidate_slot_index(teacher_username, current_shard().users_path)
+    updated = set(pending)
+    return [request_id for request_id in request_ids if request_id not in updated]
 
 def add_parent_account(student_roll_no, parent_email):
     try:
-        with closing(sqlite3.connect("users.db", timeout=10)) as conn:
+        with users_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
                 "DELETE FROM parent_accounts WHERE student_roll_no=?",
@@ -262,7 +234,7 @@ def add_parent_account(student_roll_no, parent_email):
 # Authentication functions
 def authenticate_teacher(username, password):
     """Authenticate teacher and return (name, is_admin) tuple"""
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         cursor = conn.cursor()
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
         
@@ -286,7 +258,7 @@ def authenticate_teacher(username, password):
         return None, False
 
 def authenticate_student(roll_no, password):
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         cursor = conn.cursor()
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
         cursor.execute(
@@ -298,7 +270,7 @@ def authenticate_student(roll_no, password):
 
 # Teacher functions
 def create_student(roll_no, password, full_name, class_name, section):
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         cursor = conn.cursor()
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
         try:
@@ -312,16 +284,77 @@ def create_student(roll_no, password, full_name, class_name, section):
             return False
 
 # Report functions
-def save_report(report_data):
-    with closing(sqlite3.connect("reports.db")) as conn:
+def calculate_grade(percentage):
+    if percentage >= 90:
+        return "O (Outstanding)"
+    elif percentage >= 75:
+        return "A (Very Good)"
+    elif percentage >= 60:
+        return "B (Good)"
+    elif percentage >= 50:
+        return "C (Average)"
+    elif percentage >= 40:
+        return "D (Needs Improvement)"
+    return "F (Fail)"
+
+def build_report(name, roll_no, class_name, section, marks):
+    """Build the report_data dict for save_report from subject marks"""
+    total = sum(marks.values())
+    percentage = round((total / (len(marks) * 100)) * 100, 2)
+    return {
+        "Name": name,
+        "Roll No": roll_no,
+        "Class": class_name,
+        "Section": section,
+        **marks,
+        "Total": total,
+        "Percentage": percentage,
+        "Grade": calculate_grade(percentage)
+    }
+
+def get_parent_emails(roll_nos):
+    """Return {roll_no: parent_email} for the given students"""
+    roll_nos = list(roll_nos)
+    emails = {}
+    with users_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
+        # Stay well under SQLite's bound-variable limit
+        for i in range(0, len(roll_nos), 500):
+            chunk = roll_nos[i:i + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(
+                f"SELECT student_roll_no, parent_email FROM parent_accounts WHERE student_roll_no IN ({placeholders})",
+                chunk
+            )
+            emails.update(cursor.fetchall())
+    return emails
+
+def save_report(report_data, teacher_username):
+    save_reports([report_data], teacher_username)
+
+def save_reports(reports, teacher_username):
+    """Insert several reports and their audit entries in one transaction"""
+    subjects = ["Tamil", "English", "Maths", "Science", "Social", "Computer"]
+    now = datetime.now()
+    timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+    with reports_connection() as conn:
+        cursor = conn.cursor()
+        # Take the write lock first so the old marks read for the audit log
+        # are the ones these reports replace
+        cursor.execute("BEGIN IMMEDIATE")
+        record_marks_changes(
+            cursor,
+            teacher_username,
+            {r["Roll No"]: [r[subject] for subject in subjects] for r in reports},
+            now.timestamp()
+        )
+        cursor.executemany("""
         INSERT OR REPLACE INTO reports (
             name, roll_no, class, section,
             tamil, english, maths, science, social, computer,
             total, percentage, grade, timestamp
         ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        """, [(
             report_data["Name"],
             report_data["Roll No"],
             report_data["Class"],
@@ -335,37 +368,149 @@ def save_report(report_data):
             report_data["Total"],
             report_data["Percentage"],
             report_data["Grade"],
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
+            timestamp
+        ) for report_data in reports])
         conn.commit()
 
-def get_student_report(roll_no):
-    with closing(sqlite3.connect("reports.db")) as conn:
-        df = pd.read_sql("""
-        SELECT 
-            name as "Name",
+def notify_parents_of_publish(snapshot_path):
+    """Queue a "report card published" email for each parent, with the marks the portal now serves"""
+    info, results = load_published_snapshot(snapshot_path)
+    parent_emails = get_parent_emails(results)
+    with users_connection() as conn:
+        cursor = conn.cursor()
+        for roll_no, parent_email in parent_emails.items():
+            result = results[roll_no]
+            enqueue_notification(
+                cursor,
+                parent_email,
+                f"Report card published for {result['Name']}",
+                f"The {info['term']} report card for {result['Name']} (Roll No {roll_no}) has been published.\n\n"
+                f"Total: {result['Total']}/600\n"
+                f"Percentage: {result['Percentage']}%\n"
+                f"Grade: {result['Grade']}\n\n"
+                "Log in to the Parent Portal to see the full report."
+            )
+        conn.commit()
+    if parent_emails:
+        notification_worker.wake()
+    return len(parent_emails)
+
+def discard_export():
+    """Delete the prepared export file, once it has been downloaded or replaced"""
+    export_path = st.session_state.pop("export_path", None)
+    if export_path and os.path.exists(export_path):
+        os.remove(export_path)
+
+def get_class_marks(class_name, section):
+    """Return one row per student in the class with their latest marks (None if no report)"""
+    subjects = ["Tamil", "English", "Maths", "Science", "Social", "Computer"]
+    with users_connection() as conn:
+        students = pd.read_sql("""
+        SELECT roll_no as "Roll No", full_name as "Name"
+        FROM students
+        WHERE class = ? AND section = ?
+        ORDER BY roll_no
+        """, conn, params=(class_name, section))
+    with reports_connection() as conn:
+        latest = pd.read_sql("""
+        SELECT
             roll_no as "Roll No",
-            class as "Class",
-            section as "Section",
             tamil as "Tamil",
             english as "English",
             maths as "Maths",
             science as "Science",
             social as "Social",
-            computer as "Computer",
-            total as "Total",
-            percentage as "Percentage",
-            grade as "Grade",
-            timestamp as "Date"
+            computer as "Computer"
         FROM reports
-        WHERE roll_no = ?
-        ORDER BY timestamp DESC
-        LIMIT 1
-        """, conn, params=(roll_no,))
+        WHERE id IN (
+            SELECT MAX(id) FROM reports WHERE class = ? AND section = ? GROUP BY roll_no
+        )
+        """, conn, params=(class_name, section))
+    grid = students.merge(latest, on="Roll No", how="left")
+    grid[subjects] = grid[subjects].astype("Int64")
+    return grid
+
+def get_student_report(roll_no):
+    report = fetch_student_report(current_shard(), roll_no)
+    rows = [{label: report[col] for col, label in RESULT_COLUMNS}] if report else []
+    return pd.DataFrame(rows, columns=[label for _, label in RESULT_COLUMNS])
+
+def get_teachers():
+    with users_connection() as conn:
+        df = pd.read_sql("SELECT username, full_name FROM teachers", conn)
     return df
 
+def get_students_version():
+    """Cheap fingerprint of the students table, used to rebuild the search index"""
+    with users_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(id) FROM students")
+        return cursor.fetchone()
+
+@st.cache_resource(max_entries=16)
+def get_student_search_index(school_id, version):
+    with users_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT roll_no, full_name, class, section FROM students")
+        return StudentSearchIndex(cursor.fetchall())
+
+# Published results
+# Paths are per school, so keep one current snapshot for each open shard
+@st.cache_resource(max_entries=16)
+def load_published_snapshot(path):
+    return load_snapshot(path)
+
+def get_published_results():
+    """Return (info, {roll_no: result}) for the published term, or None"""
+    path = get_current_snapshot(current_shard().path("published"))
+    return load_published_snapshot(path) if path else None
+
+def get_portal_report(published, roll_no):
+    """Serve from the published snapshot when there is one, else from reports.db"""
+    if published is None:
+        return get_student_report(roll_no)
+    _, results = published
+    rows = [results[roll_no]] if roll_no in results else []
+    return pd.DataFrame(rows, columns=[label for _, label in RESULT_COLUMNS])
+
+def get_school_summary(shard):
+    """Headline numbers for one school, used by the cross-school overview"""
+    with shard.users.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM students")
+        students = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM meeting_requests WHERE status = 'Pending'")
+        pending_meetings = cursor.fetchone()[0]
+    with shard.reports.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM reports")
+        reports = cursor.fetchone()[0]
+        cursor.execute("""
+        SELECT AVG(percentage) FROM reports
+        WHERE id IN (SELECT MAX(id) FROM reports GROUP BY roll_no)
+        """)
+        average = cursor.fetchone()[0]
+    return {
+        "Students": students,
+        "Reports": reports,
+        "Average %": round(average, 2) if average is not None else None,
+        "Pending Meetings": pending_meetings,
+    }
+
+@st.cache_data(ttl=300, show_spinner="Reading every school...")
+def get_schools_overview():
+    """(rows, errors) for the Schools tab; all tabs run on each rerun, so this is cached"""
+    rows = []
+    errors = []
+    for school_id, summary in shard_registry.fan_out(get_school_summary).items():
+        if isinstance(summary, Exception):
+            errors.append(f"Could not read {school_id}: {summary}")
+        else:
+            rows.append({"School": school_id, **summary})
+    return rows, errors
+
 def get_all_students():
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         df = pd.read_sql("""
         SELECT 
             roll_no as "Roll No",
@@ -377,14 +522,59 @@ def get_all_students():
         """, conn)
     return df
 
-# AI Prediction function
-def predict_student_performance(roll_no):
-    try:
+@st.cache_resource(max_entries=8)
+def load_archive_year(path, mtime):
+    """Index one archive year by roll_no; mtime in the key reloads it after archiving"""
+    year = os.path.basename(path)[len("reports-"):len("reports-") + 4]
+    by_roll_no = {}
+    for report in iter_archived_reports(os.path.dirname(path), years=[year]):
+        by_roll_no.setdefault(report["roll_no"], []).append(report)
+    return by_roll_no
+
+def get_archived_reports(roll_no=None):
+    """Archived reports of the current school, read only when asked for"""
+    archive_dir = current_shard().path("archive")
+    if roll_no is None:
+        rows = list(iter_archived_reports(archive_dir))
+    else:
+        rows = []
+        for year in list_archive_years(archive_dir):
+            path = archive_path(archive_dir, year)
+            rows += load_archive_year(path, os.path.getmtime(path)).get(roll_no, [])
+    return pd.DataFrame(rows, columns=EXPORT_COLUMNS)
+
+def merge_archived(archived, live):
+    """Archived plus live reports; a row left in both by an interrupted archive run counts once"""
+    if archived.empty:
+        return live
+    return pd.concat([archived, live], ignore_index=True).drop_duplicates("id", keep="last", ignore_index=True)
+
+def get_report_history(roll_no, include_archived=False):
+    with reports_connection() as conn:
         history = pd.read_sql(
             "SELECT * FROM reports WHERE roll_no=? ORDER BY timestamp",
-            sqlite3.connect("reports.db"),
+            conn,
             params=(roll_no,)
         )
+    if include_archived:
+        history = merge_archived(get_archived_reports(roll_no), history).sort_values("timestamp", ignore_index=True)
+    return history
+
+def get_portal_history(published, roll_no, include_archived=False):
+    """History for the portal prediction, frozen at publish time when a term is published"""
+    if published is None:
+        return get_report_history(roll_no, include_archived)
+    info, _ = published
+    history = pd.DataFrame(load_snapshot_history(info["path"], roll_no) or [], columns=HISTORY_COLUMNS)
+    if include_archived:
+        history = merge_archived(get_archived_reports(roll_no), history).sort_values("timestamp", ignore_index=True)
+    return history
+
+# AI Prediction function
+def predict_student_performance(roll_no, history=None):
+    try:
+        if history is None:
+            history = get_report_history(roll_no)
         
         if len(history) >= 3:
             X = history[['tamil', 'english', 'maths', 'science', 'social', 'computer']].values[:-1]
@@ -401,6 +591,70 @@ def predict_student_performance(roll_no):
         st.error(f"Prediction error: {str(e)}")
     return None
 
+# Student search
+def student_picker(key):
+    """Search box with class/section filters, returns (roll_no, full_name, class, section) or None"""
+    index = get_student_search_index(current_school.get(), get_students_version())
+    if not len(index):
+        st.warning("No students found. Please add students first.")
+        return None
+
+    query = st.text_input("Search by roll number or name", key=f"{key}_query")
+    col1, col2 = st.columns(2)
+    with col1:
+        class_name = st.selectbox("Class", ["All"] + index.classes, key=f"{key}_class")
+    with col2:
+        section = st.selectbox("Section", ["All"] + index.sections, key=f"{key}_section")
+
+    matches = index.search(
+        query,
+        class_name=None if class_name == "All" else class_name,
+        section=None if section == "All" else section
+    )
+    if not matches:
+        st.info("No matching students.")
+        return None
+    return st.selectbox(
+        "Select Student",
+        matches,
+        format_func=lambda student: f"{student[0]} - {student[1]} ({student[2]}-{student[3]})",
+        key=f"{key}_select"
+    )
+
+# Page data loading
+# Most calls one page hands to the pool: the parent portal's four, less the
+# one prefetch runs itself
+PREFETCH_FAN_OUT = 3
+
+@st.cache_resource
+def get_prefetch_pool():
+    # Shared by every session, so size it for a full connection pool's worth
+    # of pages prefetching at once rather than for a single page
+    return ThreadPoolExecutor(
+        max_workers=shard_registry.pool_size * PREFETCH_FAN_OUT,
+        thread_name_prefix="prefetch"
+    )
+
+def prefetch(**calls):
+    """Run independent reads concurrently and return their results by name.
+
+    Each keyword maps to a (function, *args) tuple. Every data helper takes
+    its own pooled connection, so the calls are safe to run on separate
+    threads; each runs in a copy of the caller's context so it reads the
+    same school. The last call runs on the caller's thread while the others
+    are in flight, so pass in-memory lookups (a published snapshot) last and
+    they never wait for a pool thread.
+    """
+    *pooled, (last_name, (last_func, *last_args)) = calls.items()
+    pool = get_prefetch_pool()
+    futures = {
+        name: pool.submit(contextvars.copy_context().run, func, *args)
+        for name, (func, *args) in pooled
+    }
+    results = {last_name: last_func(*last_args)}
+    results.update((name, future.result()) for name, future in futures.items())
+    return results
+
 # PDF Generation
 def generate_pdf_report(report_data):
     pdf = FPDF()
@@ -438,7 +692,7 @@ def generate_pdf_report(report_data):
         )
 
 def get_student_parent_email(roll_no):
-    with closing(sqlite3.connect("users.db")) as conn:
+    with users_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "SELECT parent_email FROM parent_accounts WHERE student_roll_no=?",
@@ -540,30 +794,24 @@ def teacher_portal():
     
     # Create tabs based on admin status
     if st.session_state.get('is_admin', False):
-        tabs = ["📝 Enter Marks", "👥 Manage Students", "📊 View Reports", 
+        tabs = ["📝 Enter Marks", "🧮 Class Marks", "👥 Manage Students", "📊 View Reports", 
                "📅 Meetings", "📧 Parent Emails", "➕ Add Teacher"]
+        # Admins of the default school manage the whole deployment
+        if current_school.get() == DEFAULT_SCHOOL:
+            tabs.append("🏫 Schools")
     else:
-        tabs = ["📝 Enter Marks", "👥 Manage Students", "📊 View Reports", 
+        tabs = ["📝 Enter Marks", "🧮 Class Marks", "👥 Manage Students", "📊 View Reports", 
                "📅 Meetings", "📧 Parent Emails"]
     
     # Create tabs dynamically
     created_tabs = st.tabs(tabs)
     
     with created_tabs[0]:
-        with st.form("student_marks", clear_on_submit=True):
-            st.header("Enter Student Marks")
-            
-            students_df = get_all_students()
-            if students_df.empty:
-                st.warning("No students found. Please add students first.")
-            else:
-                selected_student = st.selectbox(
-                    "Select Student",
-                    students_df["Roll No"] + " - " + students_df["Full Name"],
-                    key="mark_student_select"
-                )
-                roll_no = selected_student.split(" - ")[0]
-                
+        st.header("Enter Student Marks")
+        selected_student = student_picker("mark_student")
+        if selected_student:
+            roll_no, full_name, class_name, section = selected_student
+            with st.form("student_marks", clear_on_submit=True):
                 subjects = ["Tamil", "English", "Maths", "Science", "Social", "Computer"]
                 marks = {}
                 
@@ -579,39 +827,73 @@ def teacher_portal():
                 submitted = st.form_submit_button("Save Marks", use_container_width=True)
                 
                 if submitted:
-                    student_info = students_df[students_df["Roll No"] == roll_no].iloc[0]
-                    
-                    total = sum(marks.values())
-                    percentage = round((total / (len(subjects) * 100)) * 100, 2)
-                    
-                    if percentage >= 90:
-                        grade = "O (Outstanding)"
-                    elif percentage >= 75:
-                        grade = "A (Very Good)"
-                    elif percentage >= 60:
-                        grade = "B (Good)"
-                    elif percentage >= 50:
-                        grade = "C (Average)"
-                    elif percentage >= 40:
-                        grade = "D (Needs Improvement)"
-                    else:
-                        grade = "F (Fail)"
-                    
-                    report_data = {
-                        "Name": student_info["Full Name"],
-                        "Roll No": roll_no,
-                        "Class": student_info["Class"],
-                        "Section": student_info["Section"],
-                        **marks,
-                        "Total": total,
-                        "Percentage": percentage,
-                        "Grade": grade
-                    }
-                    
-                    save_report(report_data)
+                    report_data = build_report(full_name, roll_no, class_name, section, marks)
+                    save_report(report_data, st.session_state.username)
                     st.success("Marks saved successfully!")
     
     with created_tabs[1]:
+        st.header("Class Marks")
+        index = get_student_search_index(current_school.get(), get_students_version())
+        if not len(index):
+            st.warning("No students found. Please add students first.")
+        else:
+            col1, col2 = st.columns(2)
+            with col1:
+                grid_class = st.selectbox("Class", index.classes, key="grid_class")
+            with col2:
+                grid_section = st.selectbox("Section", index.sections, key="grid_section")
+
+            subjects = ["Tamil", "English", "Maths", "Science", "Social", "Computer"]
+            grid_key = f"class_marks_{grid_class}_{grid_section}"
+            if grid_key not in st.session_state:
+                st.session_state[grid_key] = get_class_marks(grid_class, grid_section)
+            original = st.session_state[grid_key]
+
+            if original.empty:
+                st.info("No students in this class and section.")
+            else:
+                with st.form("class_marks_form"):
+                    edited = st.data_editor(
+                        original,
+                        column_config={
+                            subject: st.column_config.NumberColumn(subject, min_value=0, max_value=100, step=1)
+                            for subject in subjects
+                        },
+                        disabled=["Roll No", "Name"],
+                        hide_index=True,
+                        use_container_width=True,
+                        key=f"{grid_key}_editor"
+                    )
+                    submitted = st.form_submit_button("Save Changes", use_container_width=True)
+
+                if submitted:
+                    # Only rows whose marks differ from what was loaded are saved
+                    changed = (edited[subjects].fillna(-1) != original[subjects].fillna(-1)).any(axis=1)
+                    changed_rows = edited[changed]
+                    incomplete = changed_rows[subjects].isna().any(axis=1)
+                    reports = [
+                        build_report(
+                            row["Name"], row["Roll No"], grid_class, grid_section,
+                            {subject: int(row[subject]) for subject in subjects}
+                        )
+                        for _, row in changed_rows[~incomplete].iterrows()
+                    ]
+                    if reports:
+                        save_reports(reports, st.session_state.username)
+                        st.session_state[grid_key] = get_class_marks(grid_class, grid_section)
+                        st.success(f"Saved marks for {len(reports)} student(s).")
+                    else:
+                        st.info("No changes to save.")
+                    if incomplete.any():
+                        st.warning(f"Skipped {int(incomplete.sum())} student(s) with missing marks.")
+
+                if st.button("Reload from database", key="reload_class_marks"):
+                    del st.session_state[grid_key]
+                    # The editor keeps unsaved edits in its own state; drop them too
+                    st.session_state.pop(f"{grid_key}_editor", None)
+                    st.rerun()
+
+    with created_tabs[2]:
         st.header("Manage Students")
         
         with st.expander("➕ Add New Student"):
@@ -636,71 +918,277 @@ def teacher_portal():
         else:
             st.dataframe(students_df, hide_index=True, use_container_width=True)
     
-    with created_tabs[2]:
+    with created_tabs[3]:
         st.header("View All Reports")
-        reports = pd.read_sql("SELECT * FROM reports ORDER BY class, section, roll_no", sqlite3.connect("reports.db"))
+        with reports_connection() as conn:
+            reports = pd.read_sql("SELECT * FROM reports ORDER BY class, section, roll_no", conn)
+        if st.checkbox("Include archived terms", key="view_reports_archived"):
+            reports = merge_archived(get_archived_reports(), reports)
         if reports.empty:
             st.info("No reports found")
         else:
             st.dataframe(reports, hide_index=True, use_container_width=True)
-    
-    with created_tabs[3]:
+
+        if st.session_state.get('is_admin', False):
+            with st.expander("📢 Publish Results"):
+                published = get_published_results()
+                if published:
+                    info, _ = published
+                    st.write(f"Serving **{info['term']}** ({info['row_count']} students, published {info['published_at']}).")
+                else:
+                    st.write("No term published. Portals read live reports.")
+
+                with st.form("publish_term_form", clear_on_submit=True):
+                    term = st.text_input("Term name", key="publish_term_name")
+                    if st.form_submit_button("Publish Term", use_container_width=True):
+                        if not term:
+                            st.error("Enter a term name.")
+                        else:
+                            path, row_count = publish_term(term, current_shard().reports_path, current_shard().path("published"))
+                            notified = notify_parents_of_publish(path)
+                            st.success(f"Published {row_count} results for {term} and queued {notified} parent email(s).")
+                            st.rerun()
+
+                if published and st.button("Unpublish", use_container_width=True, key="unpublish_term"):
+                    unpublish(current_shard().path("published"))
+                    st.rerun()
+
+        if st.session_state.get('is_admin', False):
+            with st.expander("🗄️ Archive Old Terms"):
+                archive_dir = current_shard().path("archive")
+                years = list_archive_years(archive_dir)
+                if years:
+                    st.write("Archived years: " + ", ".join(years))
+                keep_years = int(os.environ.get("ARCHIVE_KEEP_YEARS", "2"))
+                with st.form("archive_form"):
+                    archive_before = st.date_input(
+                        "Archive reports dated before",
+                        value=datetime.strptime(cutoff_for_keep_years(keep_years), "%Y-%m-%d").date(),
+                        key="archive_before"
+                    )
+                    if st.form_submit_button("Archive", use_container_width=True):
+                        archived = archive_reports(current_shard().reports_path, archive_dir, archive_before)
+                        if archived:
+                            st.success("Archived " + ", ".join(f"{n} from {year}" for year, n in sorted(archived.items())) + ".")
+                        else:
+                            st.info("No reports before that date.")
+
+        if st.session_state.get('is_admin', False):
+            with st.expander("🔍 Marks Audit"):
+                with st.form("marks_audit_form"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        audit_roll_no = st.text_input("Roll No (optional)", key="audit_roll_no")
+                    with col2:
+                        audit_teacher = st.selectbox(
+                            "Teacher", ["All"] + get_teachers()["username"].tolist(), key="audit_teacher"
+                        )
+                    audit_days = st.number_input("Last N days", min_value=1, value=30, step=1, key="audit_days")
+                    show_audit = st.form_submit_button("Show Changes", use_container_width=True)
+
+                if show_audit:
+                    with reports_connection() as conn:
+                        entries = query_marks_audit(
+                            conn,
+                            roll_no=audit_roll_no.strip() or None,
+                            teacher=None if audit_teacher == "All" else audit_teacher,
+                            since=datetime.now() - timedelta(days=int(audit_days))
+                        )
+                    if entries:
+                        st.dataframe(pd.DataFrame([{
+                            "Changed At": entry["changed_at"].strftime("%Y-%m-%d %H:%M:%S"),
+                            "Roll No": entry["roll_no"],
+                            "Teacher": entry["teacher"],
+                            "Changes": describe_change(entry),
+                        } for entry in entries]), hide_index=True, use_container_width=True)
+                        st.caption(f"Showing the latest {len(entries)} change(s).")
+                    else:
+                        st.info("No marks changes match these filters.")
+
+        with st.expander("📤 Export Reports"):
+            with st.form("export_reports_form"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    export_class = st.text_input("Class (optional)", key="export_class")
+                with col2:
+                    export_section = st.text_input("Section (optional)", key="export_section")
+                filter_dates = st.checkbox("Filter by date", key="export_filter_dates")
+                col1, col2 = st.columns(2)
+                with col1:
+                    export_from = st.date_input("From", key="export_from")
+                with col2:
+                    export_to = st.date_input("To", key="export_to")
+                export_archived = st.checkbox("Include archived terms", value=True, key="export_archived")
+                export_format = st.radio("Format", ["CSV", "Parquet"], horizontal=True, key="export_format")
+                prepare = st.form_submit_button("Prepare Export", use_container_width=True)
+
+            if prepare:
+                filters = {
+                    "db_path": current_shard().reports_path,
+                    "class_name": export_class or None,
+                    "section": export_section or None,
+                    "date_from": export_from if filter_dates else None,
+                    "date_to": export_to if filter_dates else None,
+                    "archive_dir": current_shard().path("archive") if export_archived else None,
+                }
+                discard_export()
+                suffix = ".parquet" if export_format == "Parquet" else ".csv"
+                fd, export_path = tempfile.mkstemp(prefix="reports_export_", suffix=suffix)
+                os.close(fd)
+                st.session_state.export_path = export_path
+                try:
+                    if export_format == "Parquet":
+                        count = export_reports_parquet(export_path, **filters)
+                    else:
+                        with open(export_path, "w", newline="", encoding="utf-8") as f:
+                            count = export_reports_csv(f, **filters)
+                    st.success(f"Exported {count} reports.")
+                except RuntimeError as e:
+                    discard_export()
+                    st.error(str(e))
+
+            if st.session_state.get("export_path") and os.path.exists(st.session_state.export_path):
+                export_path = st.session_state.export_path
+                with open(export_path, "rb") as f:
+                    st.download_button(
+                        "📥 Download Export",
+                        f,
+                        file_name="reports_export" + os.path.splitext(export_path)[1],
+                        mime="application/octet-stream",
+                        on_click=discard_export,
+                        use_container_width=True
+                    )
+
+    with created_tabs[4]:
         st.header("Parent Meeting Requests")
+
+        with st.expander("🗓️ Availability Slots"):
+            with st.form("availability_form", clear_on_submit=True):
+                slot_date = st.date_input("Date", min_value=datetime.now().date(), key="slot_date")
+                col1, col2 = st.columns(2)
+                with col1:
+                    slot_from = st.time_input("From", value=time(9, 0), key="slot_from")
+                with col2:
+                    slot_to = st.time_input("To", value=time(12, 0), key="slot_to")
+                col1, col2 = st.columns(2)
+                with col1:
+                    slot_minutes = st.number_input("Slot length (minutes)", min_value=5, max_value=240, value=15, step=5, key="slot_minutes")
+                with col2:
+                    slot_capacity = st.number_input("Parents per slot", min_value=1, max_value=50, value=1, step=1, key="slot_capacity")
+
+                if st.form_submit_button("Add Slots", use_container_width=True):
+                    start = datetime.combine(slot_date, slot_from)
+                    end = datetime.combine(slot_date, slot_to)
+                    slots = []
+                    while start + timedelta(minutes=slot_minutes) <= end:
+                        slot_end = start + timedelta(minutes=slot_minutes)
+                        slots.append((start.strftime(SLOT_TIME_FORMAT), slot_end.strftime(SLOT_TIME_FORMAT), slot_capacity))
+                        start = slot_end
+                    if not slots:
+                        st.error("The time range is shorter than one slot.")
+                    else:
+                        added, skipped = add_slots(st.session_state.username, slots, current_shard().users_path)
+                        st.success(f"Added {added} slot(s).")
+                        if skipped:
+                            st.warning(f"Skipped {skipped} slot(s) that overlap existing availability or have already started.")
+
+            upcoming_slots = get_teacher_slots(st.session_state.username, db_path=current_shard().users_path)
+            if upcoming_slots:
+                st.dataframe(
+                    pd.DataFrame(upcoming_slots, columns=["Start", "End", "Capacity", "Booked"]),
+                    hide_index=True,
+                    use_container_width=True
+                )
+            else:
+                st.info("No upcoming slots. Parents' preferred dates are used as requested.")
         
-        meeting_requests_df = get_meeting_requests(st.session_state.username)
-        
-        if meeting_requests_df.empty:
+        if "meeting_review_notice" in st.session_state:
+            st.warning(st.session_state.pop("meeting_review_notice"))
+        counts = get_meeting_request_counts(st.session_state.username)
+        cols = st.columns(3)
+        for col, status in zip(cols, ["Pending", "Approved", "Rejected"]):
+            with col:
+                st.metric(status, counts.get(status, 0))
+
+        if not counts:
             st.info("No meeting requests pending.")
         else:
-            pending_requests_df = meeting_requests_df[meeting_requests_df['Status'] == 'Pending']
-            other_requests_df = meeting_requests_df[meeting_requests_df['Status'] != 'Pending']
-
-            if not pending_requests_df.empty:
+            page_size = 20
+            pending_count = counts.get("Pending", 0)
+            if pending_count:
                 st.write("### Pending Requests")
-                for index, row in pending_requests_df.iterrows():
-                    request_id = row['id']
-                    with st.form(key=f"meeting_request_form_{request_id}"):
-                        st.subheader(f"Request from {row['Student Name']}")
-                        st.caption(f"Roll No: {row['Student Roll No']}")
-                        st.write(f"**Preferred Date:** {row['Preferred Date']}")
-                        st.write(f"**Requested On:** {row['Requested At']}")
-                        
-                        teacher_notes = st.text_area("Teacher Notes", key=f"notes_{request_id}")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.form_submit_button("✅ Approve", use_container_width=True):
-                                update_meeting_request_status(request_id, "Approved", teacher_notes)
-                                st.success("Meeting approved!")
-                                st.rerun()
-                        with col2:
-                            if st.form_submit_button("❌ Reject", use_container_width=True):
-                                update_meeting_request_status(request_id, "Rejected", teacher_notes)
-                                st.warning("Meeting rejected.")
-                                st.rerun()
-                        st.markdown("---")
-                
-            if not other_requests_df.empty:
+                page = 1
+                if pending_count > page_size:
+                    page = st.number_input(
+                        "Page",
+                        min_value=1,
+                        max_value=(pending_count - 1) // page_size + 1,
+                        step=1,
+                        key="pending_meetings_page"
+                    )
+                pending_requests_df = get_meeting_requests(
+                    st.session_state.username,
+                    status="Pending",
+                    limit=page_size,
+                    offset=(page - 1) * page_size
+                )
+                pending_requests_df.insert(0, "Select", False)
+
+                with st.form("pending_meetings_form"):
+                    edited_df = st.data_editor(
+                        pending_requests_df,
+                        column_config={"id": None, "Status": None, "Teacher Notes": None},
+                        disabled=[c for c in pending_requests_df.columns if c != "Select"],
+                        hide_index=True,
+                        use_container_width=True,
+                        key=f"pending_meetings_editor_{page}"
+                    )
+                    teacher_notes = st.text_area("Teacher Notes (applies to all selected)", key="meeting_bulk_notes")
+
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        approve = st.form_submit_button("✅ Approve Selected", use_container_width=True)
+                    with col2:
+                        reject = st.form_submit_button("❌ Reject Selected", use_container_width=True)
+
+                    if approve or reject:
+                        selected_ids = edited_df.loc[edited_df["Select"], "id"].tolist()
+                        if not selected_ids:
+                            st.warning("Select at least one request.")
+                        else:
+                            status = "Approved" if approve else "Rejected"
+                            skipped = update_meeting_requests_status(selected_ids, status, teacher_notes)
+                            if skipped:
+                                # Shown after the rerun, above the list
+                                st.session_state.meeting_review_notice = (
+                                    f"{len(skipped)} selected request(s) had already been reviewed and were left unchanged."
+                                )
+                            st.rerun()
+
+            reviewed_count = sum(n for status, n in counts.items() if status != "Pending")
+            if reviewed_count and st.checkbox(f"Show reviewed requests ({reviewed_count})", key="show_reviewed_meetings"):
                 st.write("### Reviewed Requests")
+                reviewed_limit = st.session_state.get("reviewed_meetings_limit", 50)
+                other_requests_df = get_meeting_requests(
+                    st.session_state.username,
+                    exclude_status="Pending",
+                    limit=reviewed_limit
+                )
                 st.dataframe(
-                    other_requests_df.drop(columns=['id']), 
-                    hide_index=True, 
+                    other_requests_df.drop(columns=['id']),
+                    hide_index=True,
                     use_container_width=True
                 )
+                if reviewed_limit < reviewed_count and st.button("Load more", key="load_more_reviewed"):
+                    st.session_state.reviewed_meetings_limit = reviewed_limit + 50
+                    st.rerun()
 
-    with created_tabs[4]:
+    with created_tabs[5]:
         st.header("Manage Parent Email Addresses")
         
-        students_df = get_all_students()
-        if students_df.empty:
-            st.warning("No students found. Please add students first.")
-        else:
-            selected_student = st.selectbox(
-                "Select Student",
-                students_df["Roll No"] + " - " + students_df["Full Name"],
-                key="parent_email_student_select"
-            )
-            roll_no = selected_student.split(" - ")[0]
+        selected_student = student_picker("parent_email_student")
+        if selected_student:
+            roll_no = selected_student[0]
             
             current_email = get_student_parent_email(roll_no)
             
@@ -715,7 +1203,7 @@ def teacher_portal():
                 if submitted:
                     if new_email:
                         try:
-                            with closing(sqlite3.connect("users.db", timeout=10)) as conn:
+                            with users_connection() as conn:
                                 cursor = conn.cursor()
                                 cursor.execute(
                                     "DELETE FROM parent_accounts WHERE student_roll_no=?",
@@ -731,7 +1219,7 @@ def teacher_portal():
                             st.error(f"Failed to save email: {str(e)}")
                     else:
                         try:
-                            with closing(sqlite3.connect("users.db", timeout=10)) as conn:
+                            with users_connection() as conn:
                                 cursor = conn.cursor()
                                 cursor.execute(
                                     "DELETE FROM parent_accounts WHERE student_roll_no=?",
@@ -743,8 +1231,8 @@ def teacher_portal():
                             st.error(f"Failed to remove email: {str(e)}")
 
     # Only show Add Teacher tab for admin users
-    if st.session_state.get('is_admin', False) and len(created_tabs) > 5:
-        with created_tabs[5]:
+    if st.session_state.get('is_admin', False) and len(created_tabs) > 6:
+        with created_tabs[6]:
             st.header("Add New Teacher (Admin Only)")
             with st.form("add_teacher_form", clear_on_submit=True):
                 new_username = st.text_input("Username*", key="new_teacher_user")
@@ -760,7 +1248,7 @@ def teacher_portal():
                     elif new_password != new_password_confirm:
                         st.error("Passwords don't match!")
                     else:
-                        with closing(sqlite3.connect("users.db")) as conn:
+                        with users_connection() as conn:
                             cursor = conn.cursor()
                             hashed_password = hashlib.sha256(new_password.encode()).hexdigest()
                             try:
@@ -776,13 +1264,94 @@ def teacher_portal():
                             except sqlite3.IntegrityError:
                                 st.error("Username already exists.")
 
+    if len(created_tabs) > 7:
+        with created_tabs[7]:
+            st.header("Schools Overview")
+            if st.button("Refresh", key="refresh_schools_overview"):
+                get_schools_overview.clear()
+            rows, errors = get_schools_overview()
+            for error in errors:
+                st.warning(error)
+            if rows:
+                st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+            st.caption("Figures are refreshed every 5 minutes.")
+
+            with st.form("add_school_form", clear_on_submit=True):
+                new_school = st.text_input("School ID (letters, digits, - and _)", key="new_school_id")
+                st.caption("First admin of the new school")
+                school_admin = st.text_input("Admin Username*", key="new_school_admin_user")
+                school_admin_name = st.text_input("Admin Full Name*", key="new_school_admin_name")
+                school_admin_password = st.text_input("Admin Password*", type="password", key="new_school_admin_pass")
+                school_admin_confirm = st.text_input("Confirm Password*", type="password", key="new_school_admin_pass_confirm")
+                if st.form_submit_button("Add School", use_container_width=True):
+                    if not valid_school_id(new_school):
+                        st.error("Invalid school ID.")
+                    elif new_school in shard_registry.list_schools():
+                        st.error("School already exists.")
+                    elif not all([school_admin, school_admin_name, school_admin_password, school_admin_confirm]):
+                        st.error("Please fill all required fields (*)")
+                    elif school_admin_password != school_admin_confirm:
+                        st.error("Passwords don't match!")
+                    else:
+                        with shard_registry.get(new_school).users.connection() as conn:
+                            conn.execute(
+                                "INSERT INTO teachers (username, password, full_name, created_at, is_admin) VALUES (?, ?, ?, ?, ?)",
+                                (school_admin, hashlib.sha256(school_admin_password.encode()).hexdigest(), school_admin_name,
+                                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 1)
+                            )
+                            conn.commit()
+                        get_schools_overview.clear()
+                        st.success(f"School {new_school} created. {school_admin} can now log in as its admin.")
+                        st.rerun()
+
+            with st.expander("Backups"):
+                if backup_scheduler.is_alive():
+                    last_run = backup_scheduler.last_run
+                    st.caption(f"Automatic backups every {backup_scheduler.interval / 3600:g} hours, "
+                               f"keeping {backup_scheduler.keep}. Last run: "
+                               f"{last_run.strftime('%Y-%m-%d %H:%M') if last_run else 'not yet'}")
+                else:
+                    st.caption("Automatic backups are off (BACKUP_INTERVAL_HOURS=0).")
+                if backup_scheduler.last_error:
+                    st.warning(f"Last backup error: {backup_scheduler.last_error}")
+
+                snapshots = [
+                    {"School": school_id, "Database": db_name, "Snapshot": os.path.basename(path),
+                     "Size (KB)": round(os.path.getsize(path) / 1024, 1)}
+                    for school_id in shard_registry.list_schools()
+                    for db_name in DATABASES
+                    for path in list_snapshots(backup_scheduler.backup_dir, school_id, db_name)
+                ]
+                if snapshots:
+                    st.dataframe(pd.DataFrame(snapshots), hide_index=True, use_container_width=True)
+                    st.caption("Restore with: python backup.py restore <snapshot> --school <id> --db users|reports")
+
+                if st.button("Back Up All Schools Now", use_container_width=True):
+                    with st.spinner("Backing up..."):
+                        failed = []
+                        for school_id in shard_registry.list_schools():
+                            try:
+                                snapshot_school(school_id, backup_scheduler.backup_dir, backup_scheduler.keep)
+                            except (sqlite3.Error, OSError) as e:
+                                failed.append(f"{school_id}: {e}")
+                    if failed:
+                        st.error("Some backups failed: " + "; ".join(failed))
+                    else:
+                        st.success("Backup complete.")
+                        st.rerun()
+
     st.sidebar.button("Logout", on_click=lambda: st.session_state.clear() or st.rerun(), use_container_width=True)
 
 def student_portal():
     st.title(f"👨‍🎓 Student Portal")
     st.subheader(f"Welcome {st.session_state.student_name}")
     
-    report = get_student_report(st.session_state.roll_no)
+    published = get_published_results()
+    page_data = prefetch(
+        history=(get_portal_history, published, st.session_state.roll_no),
+        report=(get_portal_report, published, st.session_state.roll_no)
+    )
+    report = page_data["report"]
     if report.empty:
         st.warning("No report found for your roll number.")
         st.info("Please contact your teacher if you believe this is an error.")
@@ -790,6 +1359,8 @@ def student_portal():
         data = report.iloc[0].to_dict()
         
         st.subheader("Your Latest Report Card")
+        if published:
+            st.caption(f"Published results: {published[0]['term']}")
         st.markdown(f"**Name:** {data['Name']}")
         st.markdown(f"**Class:** {data['Class']}-{data['Section']}")
         st.markdown(f"**Roll No:** {data['Roll No']}")
@@ -818,7 +1389,10 @@ def student_portal():
         st.divider()
         
         st.subheader("Performance Prediction")
-        prediction = predict_student_performance(st.session_state.roll_no)
+        history = page_data["history"]
+        if st.checkbox("Include archived terms", key="prediction_archived"):
+            history = get_portal_history(published, st.session_state.roll_no, include_archived=True)
+        prediction = predict_student_performance(st.session_state.roll_no, history)
         if prediction is not None:
             current_perc = data['Percentage']
             delta = prediction - current_perc
@@ -849,14 +1423,23 @@ def parent_portal():
     st.title(f"👪 Parent Portal")
     st.subheader(f"Student: {st.session_state.roll_no}")
     
-    student_info = get_student_info(st.session_state.roll_no)
+    published = get_published_results()
+    page_data = prefetch(
+        student_info=(get_student_info, st.session_state.roll_no),
+        latest_request=(get_single_student_meeting_request, st.session_state.roll_no),
+        teachers=(get_teachers,),
+        report=(get_portal_report, published, st.session_state.roll_no)
+    )
+    student_info = page_data["student_info"]
     st.write(f"Viewing report for: **{student_info.get('full_name', 'Unknown')}**")
     
-    report = get_student_report(st.session_state.roll_no)
+    report = page_data["report"]
     if not report.empty:
         data = report.iloc[0].to_dict()
         
         st.subheader("Student Report Card")
+        if published:
+            st.caption(f"Published results: {published[0]['term']}")
         st.markdown(f"**Name:** {data['Name']}")
         st.markdown(f"**Class:** {data['Class']}-{data['Section']}")
         st.markdown(f"**Roll No:** {data['Roll No']}")
@@ -885,7 +1468,7 @@ def parent_portal():
         
         st.divider()
         
-        latest_request_df = get_single_student_meeting_request(st.session_state.roll_no)
+        latest_request_df = page_data["latest_request"]
         if not latest_request_df.empty:
             latest_request = latest_request_df.iloc[0]
             st.info("**Latest Meeting Request Status:**")
@@ -895,23 +1478,23 @@ def parent_portal():
                 st.write(f"- **Notes:** {latest_request.get('Teacher Notes', 'N/A')}")
             st.markdown("---")
         
-        with closing(sqlite3.connect("users.db")) as conn:
-            teachers_df = pd.read_sql("SELECT username, full_name FROM teachers", conn)
+        teachers_df = page_data["teachers"]
         teacher_options = teachers_df["username"] + " - " + teachers_df["full_name"]
         selected_teacher = st.selectbox("Select Teacher", teacher_options)
         teacher_username = selected_teacher.split(" - ")[0]
-        meeting_date = st.date_input("Preferred date")
+        meeting_date = st.date_input("Preferred date", min_value=datetime.now().date())
         if st.button("Request Meeting", use_container_width=True):
             if meeting_date and teacher_username:
-                with closing(sqlite3.connect("users.db")) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "INSERT INTO meeting_requests (roll_no, meeting_date, requested_at, status, teacher_username) VALUES (?, ?, ?, ?, ?)",
-                        (st.session_state.roll_no, str(meeting_date), datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'Pending', teacher_username)
-                    )
-                    conn.commit()
-                st.success("Meeting request submitted!")
-                st.rerun()
+                result, scheduled_for = request_meeting(
+                    st.session_state.roll_no, teacher_username, meeting_date, current_shard().users_path
+                )
+                if result == "duplicate":
+                    st.warning(f"You already have a pending request with this teacher ({scheduled_for}).")
+                elif result == "full":
+                    st.warning("No free meeting slots on or after that date. Please pick another teacher or date.")
+                else:
+                    st.success(f"Meeting request submitted for {scheduled_for}!")
+                    st.rerun()
             else:
                 st.warning("Please select a date and teacher.")
         
@@ -930,9 +1513,16 @@ def main():
         st.session_state.roll_no = None
         st.session_state.student_name = None
 
+    current_school.set(st.session_state.get("school_id", DEFAULT_SCHOOL))
+
     if not st.session_state.logged_in:
         with st.sidebar:
             st.title("Login")
+            schools = shard_registry.list_schools()
+            if len(schools) > 1:
+                school_id = st.selectbox("School", schools, key="login_school")
+                st.session_state.school_id = school_id
+                current_school.set(school_id)
             choice = st.radio(
                 "Select role:",
                 ["Teacher", "Student", "Parent"],
@@ -946,6 +1536,8 @@ def main():
         elif choice == "Parent":
             parent_login()
     else:
+        if current_school.get() != DEFAULT_SCHOOL:
+            st.sidebar.caption(f"School: {current_school.get()}")
         if st.session_state.role == "teacher":
             teacher_portal()
         elif st.session_state.role == "student":
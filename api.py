@@ -0,0 +1,226 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from published_results import get_current_snapshot
+from report_data import (
+    MAX_BATCH, fetch_meeting_requests, fetch_published_reports, fetch_student_info, fetch_student_report,
+    fetch_student_reports
+)
+from schema import init_shard
+from tenancy import DEFAULT_SCHOOL, ShardRegistry
+
+def load_tokens(spec=None):
+    """Parse REPORT_API_TOKENS: comma separated "token" (any school) or "school:token" entries"""
+    spec = os.environ.get("REPORT_API_TOKENS", "") if spec is None else spec
+    tokens = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        school_id, _, token = entry.rpartition(":")
+        tokens.append((school_id or None, token))
+    return tokens
+
+def report_etag(reports, snapshot=None):
+    """ETag over the id and timestamp of each report, so it changes when marks are saved.
+
+    Published reports have no id; the snapshot file name, which is new on
+    every publish, stands in for it.
+    """
+    digest = hashlib.sha1(os.path.basename(snapshot or "").encode("utf-8"))
+    for report in reports:
+        digest.update(f"{report['roll_no']}|{report.get('id')}|{report['timestamp']};".encode("utf-8"))
+    return f'"{digest.hexdigest()}"'
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ReportApiHandler(BaseHTTPRequestHandler):
+    """Read-only JSON API over report_data. Set up by make_server()"""
+
+    registry = None
+    tokens = []
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, keep-alive
+    # clients hit Nagle + delayed ACK and wait ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def log_error(self, format, *args):
+        # Errors are logged even when request logging is off
+        super().log_message(format, *args)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def handle_request(self, method):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = parse_qs(url.query)
+        try:
+            if parts == ["api", "health"]:
+                return self.send_json(200, {"status": "ok"})
+            if parts[:1] != ["api"]:
+                raise ApiError(404, "Not found")
+
+            school_id = self.headers.get("X-School") or query.get("school", [DEFAULT_SCHOOL])[0]
+            self.authorize(school_id)
+            if school_id not in self.registry.list_schools():
+                raise ApiError(404, f"Unknown school {school_id}")
+            shard = self.registry.get(school_id)
+
+            route = parts[1:]
+            if method == "GET" and len(route) == 2 and route[0] == "reports":
+                # Same source as the parent portal: the published term if there is one
+                snapshot = get_current_snapshot(shard.path("published"))
+                if snapshot:
+                    report = fetch_published_reports(snapshot, [route[1]]).get(route[1])
+                else:
+                    report = fetch_student_report(shard, route[1])
+                if report is None:
+                    raise ApiError(404, "No report for this roll number")
+                return self.send_cached(report, [report], snapshot)
+            if method == "GET" and route == ["reports"]:
+                roll_nos = query.get("roll_no", []) + [
+                    r for value in query.get("roll_nos", []) for r in value.split(",") if r
+                ]
+                return self.send_batch(shard, roll_nos)
+            if method == "POST" and route == ["reports", "batch"]:
+                body = self.read_json()
+                roll_nos = body.get("roll_nos") if isinstance(body, dict) else None
+                if not isinstance(roll_nos, list):
+                    raise ApiError(400, 'Expected {"roll_nos": [...]}')
+                return self.send_batch(shard, [str(r) for r in roll_nos])
+            if method == "GET" and len(route) == 2 and route[0] == "students":
+                info = fetch_student_info(shard, route[1])
+                if not info:
+                    raise ApiError(404, "Unknown student")
+                return self.send_json(200, info)
+            if method == "GET" and route == ["meetings"]:
+                try:
+                    limit = int(query.get("limit", ["100"])[0])
+                    offset = int(query.get("offset", ["0"])[0])
+                except ValueError:
+                    raise ApiError(400, "limit and offset must be integers")
+                # SQLite reads a negative LIMIT as "no limit"
+                if not 1 <= limit <= 1000 or offset < 0:
+                    raise ApiError(400, "limit must be 1-1000 and offset at least 0")
+                meetings = fetch_meeting_requests(
+                    shard,
+                    teacher_username=query.get("teacher", [None])[0],
+                    status=query.get("status", [None])[0],
+                    limit=limit,
+                    offset=offset
+                )
+                return self.send_json(200, {"meetings": meetings, "limit": limit, "offset": offset})
+            raise ApiError(404, "Not found")
+        except ApiError as e:
+            self.send_json(e.status, {"error": str(e)})
+        except Exception:
+            self.log_error("Error handling %s %s", method, self.path)
+            traceback.print_exc()
+            self.send_json(500, {"error": "Internal server error"})
+
+    def authorize(self, school_id):
+        header = self.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            raise ApiError(401, "Missing bearer token")
+        given = header[len("Bearer "):].strip()
+        for token_school, token in self.tokens:
+            if hmac.compare_digest(given, token):
+                if token_school in (None, school_id):
+                    return
+                raise ApiError(403, "Token not valid for this school")
+        raise ApiError(401, "Invalid token")
+
+    def read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "Invalid Content-Length")
+        if length < 0:
+            raise ApiError(400, "Invalid Content-Length")
+        if length > 1_000_000:
+            raise ApiError(413, "Request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            raise ApiError(400, "Invalid JSON")
+
+    def send_batch(self, shard, roll_nos):
+        if not roll_nos:
+            raise ApiError(400, "No roll numbers given")
+        if len(roll_nos) > MAX_BATCH:
+            raise ApiError(400, f"At most {MAX_BATCH} roll numbers per call")
+        snapshot = get_current_snapshot(shard.path("published"))
+        if snapshot:
+            reports = fetch_published_reports(snapshot, roll_nos)
+        else:
+            reports = fetch_student_reports(shard, roll_nos)
+        missing = [r for r in dict.fromkeys(roll_nos) if r not in reports]
+        body = {"reports": reports, "missing": missing}
+        return self.send_cached(body, [reports[r] for r in sorted(reports)], snapshot)
+
+    def send_cached(self, body, reports, snapshot=None):
+        etag = report_etag(reports, snapshot)
+        match = self.headers.get("If-None-Match", "")
+        if etag in [tag.strip() for tag in match.split(",")] or match.strip() == "*":
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_json(200, body, {"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+def make_server(host="127.0.0.1", port=8600, registry=None, tokens=None, verbose=False):
+    handler = type("Handler", (ReportApiHandler,), {
+        "registry": registry or ShardRegistry(on_open=init_shard),
+        "tokens": load_tokens() if tokens is None else tokens,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON read API for student reports")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.host, args.port, verbose=args.verbose)
+    if not server.RequestHandlerClass.tokens:
+        print("Warning: REPORT_API_TOKENS is empty, every request will be rejected")
+    print(f"Serving report API on http://{args.host}:{args.port}/api/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
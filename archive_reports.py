@@ -0,0 +1,130 @@
+import argparse
+import glob
+import gzip
+import json
+import os
+import re
+import shutil
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+from export_reports import EXPORT_COLUMNS
+from tenancy import DEFAULT_SCHOOL, school_root
+
+ARCHIVE_PATTERN = "reports-*.jsonl.gz"
+
+def archive_path(archive_dir, year):
+    return os.path.join(archive_dir, f"reports-{year}.jsonl.gz")
+
+def append_member(path, lines):
+    """Append one gzip member to path without ever leaving a torn file behind.
+
+    The existing file plus the new member are written to a temp file,
+    fsynced and renamed over path, so a crash leaves either the old file
+    or the new one.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as raw:
+        if os.path.exists(path):
+            with open(path, "rb") as existing:
+                shutil.copyfileobj(existing, raw)
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            for line in lines:
+                f.write(line.encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+
+def cutoff_for_keep_years(keep_years, today=None):
+    """Cutoff date that keeps the current year plus keep_years - 1 before it"""
+    today = today or datetime.now()
+    return f"{today.year - keep_years + 1}-01-01"
+
+def archive_reports(reports_db, archive_dir, cutoff, chunk_size=5000):
+    """Move reports older than cutoff into gzip JSON-lines files, one per year.
+
+    Works in chunks: each chunk is appended (as a new gzip member, see
+    append_member) before its rows are deleted, so the write lock is only
+    held per chunk. If the job dies between the two steps the rows end up
+    in both places; iter_archived_reports skips repeats within a year and
+    callers that merge archived and live rows de-duplicate on id. Returns
+    {year: rows archived}.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = {}
+    last_id = 0
+    with closing(sqlite3.connect(reports_db, timeout=10)) as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(
+                f"SELECT {', '.join(EXPORT_COLUMNS)} FROM reports WHERE timestamp < ? AND id > ? ORDER BY id LIMIT ?",
+                (str(cutoff), last_id, chunk_size)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                conn.rollback()
+                break
+
+            by_year = {}
+            for row in rows:
+                by_year.setdefault(row[-1][:4], []).append(row)
+            for year, year_rows in by_year.items():
+                append_member(
+                    archive_path(archive_dir, year),
+                    (json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in year_rows)
+                )
+                archived[year] = archived.get(year, 0) + len(year_rows)
+
+            cursor.executemany("DELETE FROM reports WHERE id = ?", [(row[0],) for row in rows])
+            conn.commit()
+            last_id = rows[-1][0]
+    return archived
+
+def list_archive_years(archive_dir):
+    years = []
+    for path in glob.glob(os.path.join(archive_dir, ARCHIVE_PATTERN)):
+        match = re.search(r"reports-(\d{4})\.jsonl\.gz$", path)
+        if match:
+            years.append(match.group(1))
+    return sorted(years)
+
+def iter_archived_reports(archive_dir, roll_no=None, years=None):
+    """Yield archived report dicts (oldest year first), optionally for one student"""
+    for year in years or list_archive_years(archive_dir):
+        path = archive_path(archive_dir, year)
+        if not os.path.exists(path):
+            continue
+        seen = set()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                report = json.loads(line)
+                if report["id"] in seen or (roll_no is not None and report["roll_no"] != roll_no):
+                    continue
+                seen.add(report["id"])
+                yield report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old terms out of reports.db")
+    cutoff = parser.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", help="Archive reports dated before this day (YYYY-MM-DD)")
+    cutoff.add_argument("--keep-years", type=int, help="Keep this many calendar years, including the current one")
+    parser.add_argument("--school", default=DEFAULT_SCHOOL, help="School whose reports to archive")
+    parser.add_argument("--vacuum", action="store_true", help="Shrink reports.db after archiving")
+    args = parser.parse_args(argv)
+
+    root = school_root(args.school)
+    reports_db = os.path.join(root, "reports.db")
+    before = args.before or cutoff_for_keep_years(args.keep_years)
+    archived = archive_reports(reports_db, os.path.join(root, "archive"), before)
+    for year, count in sorted(archived.items()):
+        print(f"{year}: archived {count} reports")
+    if not archived:
+        print(f"No reports before {before}")
+    elif args.vacuum:
+        with closing(sqlite3.connect(reports_db, timeout=10)) as conn:
+            conn.execute("VACUUM")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import glob
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+
+from tenancy import DEFAULT_SCHOOL, ShardRegistry, school_root
+
+BACKUP_DIR = "backups"
+DATABASES = ["users", "reports"]
+
+def verify_snapshot(path):
+    """Return True if the snapshot passes SQLite's integrity check"""
+    uri = f"file:{os.path.abspath(path)}?mode=ro"
+    try:
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            return conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    except sqlite3.DatabaseError:
+        return False
+
+def backup_database(src_path, dest_path, pages=64, sleep=0.005):
+    """Copy a live database with the online backup API, a few pages per step.
+
+    Between steps the source lock is released for `sleep` seconds so readers
+    and writers keep going. The copy goes to a temporary file and is only
+    renamed into place once it passes an integrity check.
+    """
+    tmp_path = dest_path + ".tmp"
+    start = time.perf_counter()
+    with closing(sqlite3.connect(src_path, timeout=10)) as src, closing(sqlite3.connect(tmp_path)) as dest:
+        src.backup(dest, pages=pages, sleep=sleep)
+    if not verify_snapshot(tmp_path):
+        os.remove(tmp_path)
+        raise sqlite3.DatabaseError(f"Backup of {src_path} failed its integrity check")
+    os.replace(tmp_path, dest_path)
+    return {"path": dest_path, "bytes": os.path.getsize(dest_path), "seconds": time.perf_counter() - start}
+
+def list_snapshots(backup_dir, school_id, db_name):
+    """Snapshots of one database, newest first"""
+    pattern = os.path.join(backup_dir, school_id, f"{db_name}-*.db")
+    return sorted(glob.glob(pattern), reverse=True)
+
+def last_snapshot_time(backup_dir, school_id):
+    """mtime of the school's newest snapshot, or None if it has none"""
+    times = [
+        os.path.getmtime(snapshots[0])
+        for snapshots in (list_snapshots(backup_dir, school_id, db_name) for db_name in DATABASES)
+        if snapshots
+    ]
+    return max(times) if times else None
+
+def rotate(backup_dir, school_id, db_name, keep):
+    """Delete all but the newest `keep` snapshots, return the deleted paths"""
+    removed = list_snapshots(backup_dir, school_id, db_name)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def snapshot_school(school_id, backup_dir=BACKUP_DIR, keep=7, pages=64, sleep=0.005):
+    """Back up both databases of one school and rotate old snapshots"""
+    root = school_root(school_id)
+    target_dir = os.path.join(backup_dir, school_id)
+    os.makedirs(target_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    results = []
+    for db_name in DATABASES:
+        src = os.path.join(root, f"{db_name}.db")
+        if not os.path.exists(src):
+            continue
+        results.append(backup_database(src, os.path.join(target_dir, f"{db_name}-{stamp}.db"), pages, sleep))
+        rotate(backup_dir, school_id, db_name, keep)
+    return results
+
+def restore_database(snapshot_path, dest_path, pages=-1):
+    """Copy a verified snapshot back over a live database with the backup API"""
+    if not verify_snapshot(snapshot_path):
+        raise sqlite3.DatabaseError(f"{snapshot_path} failed its integrity check, not restoring")
+    uri = f"file:{os.path.abspath(snapshot_path)}?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True)) as src, closing(sqlite3.connect(dest_path, timeout=30)) as dest:
+        src.backup(dest, pages=pages)
+
+class BackupScheduler(threading.Thread):
+    """Background thread that snapshots every school every `interval` seconds.
+
+    The first run is timed from the existing snapshots, so restarting the
+    app neither skips a due backup nor takes an extra one.
+    """
+
+    def __init__(self, interval, registry=None, backup_dir=BACKUP_DIR, keep=7, pages=64, sleep=0.005):
+        super().__init__(name="backup-scheduler", daemon=True)
+        self.interval = interval
+        self.registry = registry or ShardRegistry()
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.pages = pages
+        self.sleep = sleep
+        self.last_run = None
+        self.last_error = None
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def first_delay(self):
+        """Seconds until the first run: now if any school's newest snapshot is missing or too old"""
+        times = [last_snapshot_time(self.backup_dir, school_id) for school_id in self.registry.list_schools()]
+        if not times or None in times:
+            return 0
+        return max(min(times) + self.interval - time.time(), 0)
+
+    def run(self):
+        delay = self.first_delay()
+        while not self._stopping.wait(delay):
+            delay = self.interval
+            for school_id in self.registry.list_schools():
+                try:
+                    snapshot_school(school_id, self.backup_dir, self.keep, self.pages, self.sleep)
+                except (sqlite3.Error, OSError) as e:
+                    self.last_error = f"{school_id}: {e}"
+            self.last_run = datetime.now()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online backups of the school databases")
+    parser.add_argument("--backup-dir", default=BACKUP_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Snapshot now")
+    run.add_argument("--school", help="Only this school (default: all)")
+    run.add_argument("--keep", type=int, default=7, help="Snapshots to keep per database")
+
+    sub.add_parser("list", help="List snapshots")
+
+    verify = sub.add_parser("verify", help="Integrity-check a snapshot")
+    verify.add_argument("snapshot")
+
+    restore = sub.add_parser("restore", help="Restore a snapshot over a live database")
+    restore.add_argument("snapshot")
+    restore.add_argument("--school", default=DEFAULT_SCHOOL)
+    restore.add_argument("--db", choices=DATABASES, required=True)
+
+    args = parser.parse_args(argv)
+    registry = ShardRegistry()
+
+    if args.command == "run":
+        for school_id in [args.school] if args.school else registry.list_schools():
+            for result in snapshot_school(school_id, args.backup_dir, args.keep):
+                print(f"{result['path']}: {result['bytes']} bytes in {result['seconds']:.2f}s")
+    elif args.command == "list":
+        for school_id in registry.list_schools():
+            for db_name in DATABASES:
+                for path in list_snapshots(args.backup_dir, school_id, db_name):
+                    print(path)
+    elif args.command == "verify":
+        ok = verify_snapshot(args.snapshot)
+        print("ok" if ok else "FAILED")
+        raise SystemExit(0 if ok else 1)
+    elif args.command == "restore":
+        dest = os.path.join(school_root(args.school), f"{args.db}.db")
+        try:
+            restore_database(args.snapshot, dest)
+        except sqlite3.DatabaseError as e:
+            raise SystemExit(str(e))
+        print(f"Restored {args.snapshot} into {dest}")
+
+if __name__ == "__main__":
+    main()
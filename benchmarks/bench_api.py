@@ -0,0 +1,146 @@
+"""Compare the JSON API with per-student reads and, when Streamlit is
+installed, with a full rerun of the parent portal.
+
+    python benchmarks/bench_api.py [--students 2000] [--requests 200]
+
+With the defaults (2000 students, 3 reports each; Python 3.11, Streamlit
+1.66, local disk) two runs gave:
+
+    API: one GET per student                   0.29 ms/student
+    API: one GET per student, 304 revalidation 0.29 ms/student
+    API: one batch GET for all students        0.02 ms/student
+    API: one batch POST for all students       0.02 ms/student
+    Streamlit: parent portal rerun per student 376-446 ms/student
+
+so a client that needs several students' reports should use the batch
+endpoints, which are four orders of magnitude cheaper than driving the
+portal page.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from api import make_server  # noqa: E402
+from tenancy import ShardRegistry  # noqa: E402
+
+SUBJECTS = ["tamil", "english", "maths", "science", "social", "computer"]
+
+def build_databases(students, reports_per_student):
+    with closing(sqlite3.connect("users.db")) as conn:
+        conn.executescript("""
+        CREATE TABLE students (id INTEGER PRIMARY KEY AUTOINCREMENT, roll_no TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL, full_name TEXT NOT NULL, class TEXT NOT NULL, section TEXT NOT NULL,
+            created_at TEXT NOT NULL);
+        CREATE TABLE meeting_requests (id INTEGER PRIMARY KEY AUTOINCREMENT, roll_no TEXT NOT NULL,
+            meeting_date TEXT NOT NULL, requested_at TEXT NOT NULL, status TEXT DEFAULT 'Pending',
+            teacher_notes TEXT, approval_timestamp TEXT, teacher_username TEXT, slot_id INTEGER);
+        """)
+        conn.executemany(
+            "INSERT INTO students (roll_no, password, full_name, class, section, created_at) VALUES (?, '', ?, 'X', 'A', '2025-01-01 00:00:00')",
+            [(str(1000 + i), f"Student {i}") for i in range(students)]
+        )
+        conn.commit()
+    with closing(sqlite3.connect("reports.db")) as conn:
+        conn.executescript("""
+        CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, roll_no TEXT NOT NULL,
+            class TEXT NOT NULL, section TEXT NOT NULL, tamil INTEGER NOT NULL, english INTEGER NOT NULL,
+            maths INTEGER NOT NULL, science INTEGER NOT NULL, social INTEGER NOT NULL, computer INTEGER NOT NULL,
+            total INTEGER NOT NULL, percentage REAL NOT NULL, grade TEXT NOT NULL, timestamp TEXT NOT NULL);
+        CREATE INDEX idx_reports_roll_no_timestamp ON reports (roll_no, timestamp);
+        """)
+        rows = []
+        for term in range(reports_per_student):
+            for i in range(students):
+                marks = [random.randint(30, 100) for _ in SUBJECTS]
+                rows.append((f"Student {i}", str(1000 + i), *marks, sum(marks), round(sum(marks) / 6, 2),
+                             "A", f"202{term}-06-01 10:00:00"))
+        conn.executemany(
+            "INSERT INTO reports (name, roll_no, class, section, tamil, english, maths, science, social, computer, "
+            "total, percentage, grade, timestamp) VALUES (?, ?, 'X', 'A', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def report(label, samples, per=1):
+    total = sum(samples)
+    print(f"{label:<44} {total * 1000:9.1f} ms total  {statistics.median(samples) * 1000:7.2f} ms median"
+          + (f"  {total / per * 1000:7.3f} ms/student" if per > 1 else ""))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--reports", type=int, default=3, help="Reports per student")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    os.chdir(workdir)
+    build_databases(args.students, args.reports)
+    roll_nos = [str(1000 + i) for i in random.sample(range(args.students), args.requests)]
+
+    server = make_server(port=0, registry=ShardRegistry(), tokens=[(None, "bench")])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+    headers = {"Authorization": "Bearer bench"}
+
+    def get(path, extra=None):
+        conn.request("GET", path, headers={**headers, **(extra or {})})
+        response = conn.getresponse()
+        response.read()
+        return response
+
+    etags = {r: get(f"/api/reports/{r}").getheader("ETag") for r in roll_nos}
+    print(f"{args.students} students, {args.reports} reports each, {args.requests} students per run\n")
+
+    report("API: one GET per student", timed(lambda: [get(f"/api/reports/{r}") for r in roll_nos], 5), 5 * len(roll_nos))
+    report("API: one GET per student, 304 revalidation",
+           timed(lambda: [get(f"/api/reports/{r}", {"If-None-Match": etags[r]}) for r in roll_nos], 5),
+           5 * len(roll_nos))
+    batch_path = "/api/reports?roll_nos=" + ",".join(roll_nos)
+    report("API: one batch GET for all students", timed(lambda: get(batch_path), 5), 5 * len(roll_nos))
+    body = json.dumps({"roll_nos": roll_nos})
+
+    def post_batch():
+        conn.request("POST", "/api/reports/batch", body=body, headers={**headers, "Content-Type": "application/json"})
+        conn.getresponse().read()
+    report("API: one batch POST for all students", timed(post_batch, 5), 5 * len(roll_nos))
+
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("\nStreamlit not installed: skipped the parent portal rerun comparison")
+        return
+
+    def rerun_parent_portal(roll_no):
+        app = AppTest.from_file(os.path.join(APP_DIR, "Home.py"), default_timeout=60)
+        app.session_state["logged_in"] = True
+        app.session_state["role"] = "parent"
+        app.session_state["roll_no"] = roll_no
+        app.run()
+
+    sample = roll_nos[:20]
+    report("Streamlit: parent portal rerun per student",
+           timed(lambda: [rerun_parent_portal(r) for r in sample], 1), len(sample))
+
+if __name__ == "__main__":
+    main()
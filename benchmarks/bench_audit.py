@@ -0,0 +1,102 @@
+"""Measure what the marks audit log adds to bulk marks saves.
+
+Saves whole classes the way save_reports does (one transaction, one
+executemany) with and without record_marks_changes, against a reports
+table that already holds earlier terms.
+
+    python benchmarks/bench_audit.py [--students 5000] [--class-size 40] [--dir .]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marks_audit import SUBJECTS, create_marks_audit, record_marks_changes  # noqa: E402
+
+INSERT_REPORT = (
+    "INSERT INTO reports (name, roll_no, class, section, tamil, english, maths, science, social, computer, "
+    "total, percentage, grade, timestamp) VALUES (?, ?, 'X', 'A', ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def build_database(path, students, terms):
+    with closing(sqlite3.connect(path)) as conn:
+        conn.executescript("""
+        CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, roll_no TEXT NOT NULL,
+            class TEXT NOT NULL, section TEXT NOT NULL, tamil INTEGER NOT NULL, english INTEGER NOT NULL,
+            maths INTEGER NOT NULL, science INTEGER NOT NULL, social INTEGER NOT NULL, computer INTEGER NOT NULL,
+            total INTEGER NOT NULL, percentage REAL NOT NULL, grade TEXT NOT NULL, timestamp TEXT NOT NULL);
+        CREATE INDEX idx_reports_class_section ON reports (class, section);
+        CREATE INDEX idx_reports_roll_no_timestamp ON reports (roll_no, timestamp);
+        """)
+        create_marks_audit(conn.cursor())
+        for term in range(terms):
+            conn.executemany(INSERT_REPORT, [
+                report_row(str(1000 + i), random_marks(), f"202{term}-06-01 10:00:00") for i in range(students)
+            ])
+        conn.commit()
+
+def random_marks():
+    return [random.randint(30, 100) for _ in SUBJECTS]
+
+def report_row(roll_no, marks, timestamp):
+    return (f"Student {roll_no}", roll_no, *marks, sum(marks), round(sum(marks) / 6, 2), "A", timestamp)
+
+def save_class(conn, batch, audit):
+    """batch is [(roll_no, marks)]; mirrors save_reports in Home.py"""
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    if audit:
+        record_marks_changes(cursor, "bench", dict(batch))
+    cursor.executemany(INSERT_REPORT, [report_row(roll_no, marks, "2030-01-01 10:00:00") for roll_no, marks in batch])
+    conn.commit()
+
+def run(path, students, class_size, rounds, audit):
+    roll_nos = [str(1000 + i) for i in range(students)]
+    samples = []
+    with closing(sqlite3.connect(path)) as conn:
+        for _ in range(rounds):
+            batch = [(roll_no, random_marks()) for roll_no in random.sample(roll_nos, class_size)]
+            start = time.perf_counter()
+            save_class(conn, batch, audit)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--terms", type=int, default=3, help="Earlier reports per student")
+    parser.add_argument("--class-size", type=int, default=40, help="Reports per save")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--dir", help="Where to create the databases (default: a temp dir); "
+                                      "use the app's disk, commit cost depends on it")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_audit_", dir=args.dir)
+    results = {}
+    for audit in (False, True):
+        path = os.path.join(workdir, f"reports-{'audit' if audit else 'plain'}.db")
+        random.seed(1)
+        build_database(path, args.students, args.terms)
+        results[audit] = run(path, args.students, args.class_size, args.rounds, audit)
+
+    print(f"{args.students} students, {args.terms} earlier terms, {args.rounds} saves of {args.class_size} reports\n")
+    for audit, samples in results.items():
+        print(f"{'with audit' if audit else 'without audit':<16} "
+              f"median {statistics.median(samples) * 1000:6.2f} ms  "
+              f"mean {statistics.mean(samples) * 1000:6.2f} ms  "
+              f"{statistics.mean(samples) / args.class_size * 1e6:6.1f} µs/report")
+    extra = statistics.median(results[True]) - statistics.median(results[False])
+    print(f"\nAudit log adds {extra * 1000:.2f} ms per save ({extra / args.class_size * 1e6:.1f} µs/report, median)")
+    with closing(sqlite3.connect(os.path.join(workdir, "reports-audit.db"))) as conn:
+        rows, size = conn.execute("SELECT COUNT(*), SUM(LENGTH(old_marks) + LENGTH(new_marks)) FROM marks_audit").fetchone()
+    print(f"Audit rows written: {rows} ({size / rows:.0f} bytes of marks per row)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Measure how much an online backup slows down foreground commits.
+
+Runs the same stream of small commits three times: with no backup, while
+backup.py copies the database a few pages per step, and while it copies
+it in one step (pages=-1, which is what a plain `.backup` does).
+
+    python benchmarks/bench_backup.py [--rows 50000] [--pages 64] [--sleep 0.005]
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import closing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup import backup_database  # noqa: E402
+
+def build_database(path, rows):
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("""
+        CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, roll_no TEXT NOT NULL,
+            class TEXT NOT NULL, section TEXT NOT NULL, tamil INTEGER NOT NULL, english INTEGER NOT NULL,
+            maths INTEGER NOT NULL, science INTEGER NOT NULL, social INTEGER NOT NULL, computer INTEGER NOT NULL,
+            total INTEGER NOT NULL, percentage REAL NOT NULL, grade TEXT NOT NULL, timestamp TEXT NOT NULL)
+        """)
+        conn.execute("CREATE INDEX idx_reports_roll_no_timestamp ON reports (roll_no, timestamp)")
+        conn.executemany(
+            "INSERT INTO reports (name, roll_no, class, section, tamil, english, maths, science, social, computer, "
+            "total, percentage, grade, timestamp) VALUES (?, ?, 'X', 'A', 80, 80, 80, 80, 80, 80, 480, 80.0, 'A', ?)",
+            ((f"Student {i}", str(1000 + i), "2025-06-01 10:00:00") for i in range(rows))
+        )
+        conn.commit()
+
+def foreground(path, writes):
+    """Latency of save_report-sized commits followed by a report lookup"""
+    samples = []
+    with closing(sqlite3.connect(path, timeout=30)) as conn:
+        for i in range(writes):
+            start = time.perf_counter()
+            conn.execute(
+                "INSERT INTO reports (name, roll_no, class, section, tamil, english, maths, science, social, computer, "
+                "total, percentage, grade, timestamp) VALUES ('New', ?, 'X', 'A', 90, 90, 90, 90, 90, 90, 540, 90.0, "
+                "'A+', '2026-06-01 10:00:00')",
+                (str(1000 + i),)
+            )
+            conn.commit()
+            conn.execute("SELECT * FROM reports WHERE roll_no = ? ORDER BY timestamp DESC LIMIT 1", (str(1000 + i),)).fetchone()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+def report(label, samples, backups=None):
+    samples = sorted(samples)
+    p99 = samples[max(int(len(samples) * 0.99) - 1, 0)]
+    print(f"{label:<28} p50 {statistics.median(samples) * 1000:6.2f} ms  p99 {p99 * 1000:7.2f} ms  "
+          f"max {samples[-1] * 1000:7.2f} ms" + (f"  ({backups} backups finished)" if backups is not None else ""))
+
+def with_backups(path, snapshot, writes, pages, sleep):
+    """Run the foreground writes while backups of the same file run back to back"""
+    done = threading.Event()
+    finished = []
+
+    def run():
+        while not done.is_set():
+            backup_database(path, snapshot, pages, sleep)
+            finished.append(1)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    samples = foreground(path, writes)
+    done.set()
+    thread.join()
+    return samples, len(finished)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--writes", type=int, default=400)
+    parser.add_argument("--pages", type=int, default=64, help="Pages copied per backup step")
+    parser.add_argument("--sleep", type=float, default=0.005, help="Seconds between backup steps")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_backup_")
+    path = os.path.join(workdir, "reports.db")
+    snapshot = os.path.join(workdir, "snapshot.db")
+    build_database(path, args.rows)
+    print(f"{os.path.getsize(path) / 1e6:.1f} MB database, {args.writes} foreground commits per run\n")
+
+    report("no backup", foreground(path, args.writes))
+    report(f"incremental ({args.pages} pages)", *with_backups(path, snapshot, args.writes, args.pages, args.sleep))
+    report("one step (pages=-1)", *with_backups(path, snapshot, args.writes, -1, 0))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+EXPORT_COLUMNS = [
+    "id", "name", "roll_no", "class", "section",
+    "tamil", "english", "maths", "science", "social", "computer",
+    "total", "percentage", "grade", "timestamp",
+]
+
+def build_report_filter(class_name=None, section=None, date_from=None, date_to=None):
+    """Build the WHERE clause and params for the export filters"""
+    clauses = []
+    params = []
+    if class_name:
+        clauses.append("class = ?")
+        params.append(class_name)
+    if section:
+        clauses.append("section = ?")
+        params.append(section)
+    if date_from:
+        clauses.append("timestamp >= ?")
+        params.append(str(date_from))
+    if date_to:
+        # date_to is inclusive of the whole day
+        clauses.append("timestamp < date(?, '+1 day')")
+        params.append(str(date_to))
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+def iter_archived_chunks(conn, archive_dir, class_name=None, section=None,
+                         date_from=None, date_to=None, chunk_size=1000):
+    """Yield lists of archived report rows that match the export filters.
+
+    Rows an interrupted archive run left in the live table as well are
+    skipped here, so the export holds each report once.
+    """
+    # archive_reports imports EXPORT_COLUMNS from this module
+    from archive_reports import iter_archived_reports, list_archive_years
+
+    years = [
+        year for year in list_archive_years(archive_dir)
+        if (not date_from or year >= str(date_from)[:4]) and (not date_to or year <= str(date_to)[:4])
+    ]
+
+    def without_live(rows):
+        ids = [row[0] for row in rows]
+        cursor = conn.execute("SELECT id FROM reports WHERE id BETWEEN ? AND ?", (min(ids), max(ids)))
+        live = {row[0] for row in cursor}
+        return [row for row in rows if row[0] not in live]
+
+    chunk = []
+    for report in iter_archived_reports(archive_dir, years=years):
+        if ((class_name and report["class"] != class_name)
+                or (section and report["section"] != section)
+                or (date_from and report["timestamp"] < str(date_from))
+                or (date_to and report["timestamp"][:10] > str(date_to))):
+            continue
+        chunk.append(tuple(report[column] for column in EXPORT_COLUMNS))
+        if len(chunk) == chunk_size:
+            rows = without_live(chunk)
+            if rows:
+                yield rows
+            chunk = []
+    if chunk:
+        rows = without_live(chunk)
+        if rows:
+            yield rows
+
+def iter_report_chunks(db_path="reports.db", class_name=None, section=None,
+                       date_from=None, date_to=None, chunk_size=1000, archive_dir=None):
+    """Yield lists of report rows, at most chunk_size at a time.
+
+    With archive_dir, matching archived reports come first (oldest year
+    first), followed by the live ones.
+    """
+    where, params = build_report_filter(class_name, section, date_from, date_to)
+    with closing(sqlite3.connect(db_path)) as conn:
+        if archive_dir:
+            yield from iter_archived_chunks(conn, archive_dir, class_name, section, date_from, date_to, chunk_size)
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(EXPORT_COLUMNS)} FROM reports{where} ORDER BY id",
+            params
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+def export_reports_csv(out, **filters):
+    """Stream report rows as CSV into a text file object, return row count"""
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+    count = 0
+    for rows in iter_report_chunks(**filters):
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+def export_reports_parquet(path, **filters):
+    """Stream report rows into a Parquet file, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("roll_no", pa.string()),
+        ("class", pa.string()),
+        ("section", pa.string()),
+        ("tamil", pa.int64()),
+        ("english", pa.int64()),
+        ("maths", pa.int64()),
+        ("science", pa.int64()),
+        ("social", pa.int64()),
+        ("computer", pa.int64()),
+        ("total", pa.int64()),
+        ("percentage", pa.float64()),
+        ("grade", pa.string()),
+        ("timestamp", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in iter_report_chunks(**filters):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                schema=schema
+            ))
+            count += len(rows)
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export student reports to CSV or Parquet")
+    parser.add_argument("output", help="Output file path, or - for CSV on stdout")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--db", default="reports.db", help="Path to reports database")
+    parser.add_argument("--class", dest="class_name", help="Only export this class")
+    parser.add_argument("--section", help="Only export this section")
+    parser.add_argument("--from", dest="date_from", help="Start date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="End date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--archive-dir", help="Archived reports to include (default: the archive folder next to --db)")
+    parser.add_argument("--live-only", action="store_true", help="Leave out archived reports")
+    args = parser.parse_args(argv)
+
+    filters = {
+        "db_path": args.db,
+        "class_name": args.class_name,
+        "section": args.section,
+        "date_from": args.date_from,
+        "date_to": args.date_to,
+        "chunk_size": args.chunk_size,
+        "archive_dir": None if args.live_only else (
+            args.archive_dir or os.path.join(os.path.dirname(os.path.abspath(args.db)), "archive")
+        ),
+    }
+
+    if args.format == "parquet":
+        if args.output == "-":
+            parser.error("Parquet export needs an output file")
+        count = export_reports_parquet(args.output, **filters)
+    elif args.output == "-":
+        count = export_reports_csv(sys.stdout, **filters)
+    else:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            count = export_reports_csv(f, **filters)
+
+    print(f"Exported {count} reports", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
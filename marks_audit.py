@@ -0,0 +1,144 @@
+import argparse
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+from report_data import latest_reports
+from tenancy import DEFAULT_SCHOOL, school_root
+
+SUBJECTS = ["tamil", "english", "maths", "science", "social", "computer"]
+
+# One row per changed report. Marks are 0-100, so each set is stored as six
+# bytes in SUBJECTS order and the time as epoch seconds: ~40 bytes a row.
+# old_marks is NULL for a student's first report.
+AUDIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS marks_audit (
+    id INTEGER PRIMARY KEY,
+    changed_at INTEGER NOT NULL,
+    roll_no TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    old_marks BLOB,
+    new_marks BLOB NOT NULL
+)
+"""
+
+def create_marks_audit(cursor):
+    cursor.execute(AUDIT_SCHEMA)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_marks_audit_roll_no ON marks_audit (roll_no, changed_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_marks_audit_teacher ON marks_audit (teacher, changed_at)")
+    for action in ("UPDATE", "DELETE"):
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS marks_audit_no_{action.lower()}
+        BEFORE {action} ON marks_audit
+        BEGIN
+            SELECT RAISE(ABORT, 'marks_audit is append-only');
+        END
+        """)
+
+def pack_marks(marks):
+    return bytes(marks)
+
+def unpack_marks(blob):
+    return list(blob) if blob is not None else None
+
+def latest_marks(cursor, roll_nos):
+    """{roll_no: marks tuple} of each student's latest report, read on the caller's cursor"""
+    return {
+        roll_no: tuple(report[subject] for subject in SUBJECTS)
+        for roll_no, report in latest_reports(cursor, roll_nos, SUBJECTS).items()
+    }
+
+def record_marks_changes(cursor, teacher, new_marks, changed_at=None):
+    """Append an audit row for each student whose marks differ from their latest report.
+
+    new_marks is {roll_no: marks in SUBJECTS order}. Call it on the same
+    cursor, inside the same transaction and before inserting the new
+    reports, so the log can't disagree with the reports table. Returns the
+    number of rows written.
+    """
+    changed_at = int(changed_at if changed_at is not None else datetime.now().timestamp())
+    old = latest_marks(cursor, new_marks)
+    rows = []
+    for roll_no, marks in new_marks.items():
+        marks = tuple(int(m) for m in marks)
+        previous = old.get(roll_no)
+        if previous == marks:
+            continue
+        rows.append((
+            changed_at, roll_no, teacher,
+            pack_marks(previous) if previous is not None else None,
+            pack_marks(marks)
+        ))
+    cursor.executemany(
+        "INSERT INTO marks_audit (changed_at, roll_no, teacher, old_marks, new_marks) VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+def query_marks_audit(conn, roll_no=None, teacher=None, since=None, until=None, limit=200):
+    """Newest audit entries first, as dicts with per-subject old/new marks"""
+    clauses = []
+    params = []
+    if roll_no:
+        clauses.append("roll_no = ?")
+        params.append(roll_no)
+    if teacher:
+        clauses.append("teacher = ?")
+        params.append(teacher)
+    if since is not None:
+        clauses.append("changed_at >= ?")
+        params.append(int(since.timestamp()))
+    if until is not None:
+        clauses.append("changed_at < ?")
+        params.append(int(until.timestamp()))
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    params.append(limit)
+
+    cursor = conn.cursor()
+    cursor.execute(f"""
+    SELECT id, changed_at, roll_no, teacher, old_marks, new_marks
+    FROM marks_audit
+    {where}
+    ORDER BY changed_at DESC, id DESC
+    LIMIT ?
+    """, params)
+    entries = []
+    for entry_id, changed_at, entry_roll_no, entry_teacher, old_marks, new_marks in cursor:
+        old = unpack_marks(old_marks)
+        new = unpack_marks(new_marks)
+        entries.append({
+            "id": entry_id,
+            "changed_at": datetime.fromtimestamp(changed_at),
+            "roll_no": entry_roll_no,
+            "teacher": entry_teacher,
+            "old": dict(zip(SUBJECTS, old)) if old else None,
+            "new": dict(zip(SUBJECTS, new)),
+        })
+    return entries
+
+def describe_change(entry):
+    """Short text such as "maths 72→81, science 60→65" for one audit entry"""
+    if entry["old"] is None:
+        return "first entry: " + ", ".join(f"{s} {m}" for s, m in entry["new"].items())
+    return ", ".join(
+        f"{subject} {entry['old'][subject]}→{mark}"
+        for subject, mark in entry["new"].items()
+        if entry["old"][subject] != mark
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the marks audit log")
+    parser.add_argument("--school", default=DEFAULT_SCHOOL)
+    parser.add_argument("--roll-no")
+    parser.add_argument("--teacher")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    reports_db = os.path.join(school_root(args.school), "reports.db")
+    with closing(sqlite3.connect(reports_db)) as conn:
+        for entry in query_marks_audit(conn, args.roll_no, args.teacher, limit=args.limit):
+            print(f"{entry['changed_at']:%Y-%m-%d %H:%M:%S}  {entry['roll_no']:<10} {entry['teacher']:<12} {describe_change(entry)}")
+
+if __name__ == "__main__":
+    main()
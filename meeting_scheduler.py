@@ -0,0 +1,225 @@
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import closing
+from datetime import datetime
+
+# Slot times are stored as "YYYY-MM-DD HH:MM" so they sort as text
+SLOT_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+class SlotIndex:
+    """Interval index over one teacher's (non-overlapping) availability slots.
+
+    Starts and ends are kept in sorted lists for bisect-based conflict checks,
+    and a max segment tree over the remaining capacity of each slot finds the
+    next slot with room in O(log n).
+    """
+
+    def __init__(self, slots):
+        slots = sorted(slots, key=lambda s: s[1])
+        self.ids = [s[0] for s in slots]
+        self.starts = [s[1] for s in slots]
+        self.ends = [s[2] for s in slots]
+        self.positions = {slot_id: i for i, slot_id in enumerate(self.ids)}
+        self.size = 1
+        while self.size < max(len(slots), 1):
+            self.size *= 2
+        self.tree = [0] * (2 * self.size)
+        for i, (_, _, _, capacity, booked) in enumerate(slots):
+            self.tree[self.size + i] = capacity - booked
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def conflicts(self, start, end):
+        """Return ids of slots overlapping [start, end)"""
+        # Slots never overlap each other, so ends are sorted like starts
+        lo = bisect_right(self.ends, start)
+        hi = bisect_left(self.starts, end)
+        return self.ids[lo:hi]
+
+    def update(self, slot_id, delta):
+        node = self.size + self.positions[slot_id]
+        self.tree[node] += delta
+        node //= 2
+        while node:
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def next_free(self, after):
+        """Return (slot_id, start) of the first slot starting at or after `after` with room"""
+        first = bisect_left(self.starts, after)
+        if first >= len(self.ids):
+            return None
+        i = self._first_free(1, 0, self.size - 1, first)
+        if i < 0:
+            return None
+        return self.ids[i], self.starts[i]
+
+    def _first_free(self, node, lo, hi, first):
+        if hi < first or self.tree[node] <= 0:
+            return -1
+        if lo == hi:
+            return lo
+        mid = (lo + hi) // 2
+        found = self._first_free(2 * node, lo, mid, first)
+        if found < 0:
+            found = self._first_free(2 * node + 1, mid + 1, hi, first)
+        return found
+
+# Per-process cache of slot indexes keyed by (db_path, teacher_username)
+_slot_indexes = {}
+_index_lock = threading.Lock()
+
+def _load_slot_index(cursor, teacher_username):
+    cursor.execute(
+        "SELECT id, start_time, end_time, capacity, booked FROM meeting_slots WHERE teacher_username=?",
+        (teacher_username,)
+    )
+    return SlotIndex(cursor.fetchall())
+
+def _get_slot_index(cursor, db_path, teacher_username):
+    key = (db_path, teacher_username)
+    index = _slot_indexes.get(key)
+    if index is None:
+        index = _load_slot_index(cursor, teacher_username)
+        _slot_indexes[key] = index
+    return index
+
+def invalidate_slot_index(teacher_username, db_path="users.db"):
+    with _index_lock:
+        _slot_indexes.pop((db_path, teacher_username), None)
+
+def add_slots(teacher_username, slots, db_path="users.db"):
+    """Add (start, end, capacity) availability slots for a teacher.
+
+    Slots overlapping an existing slot or starting in the past are skipped.
+    Returns (added, skipped).
+    """
+    added = skipped = 0
+    now = datetime.now().strftime(SLOT_TIME_FORMAT)
+    with _index_lock, closing(sqlite3.connect(db_path, timeout=10)) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            index = _load_slot_index(cursor, teacher_username)
+            last_end = ""
+            for start, end, capacity in sorted(slots):
+                # New slots are checked against the stored ones and each other
+                if end <= start or capacity < 1 or start < now or start < last_end or index.conflicts(start, end):
+                    skipped += 1
+                    continue
+                cursor.execute(
+                    "INSERT INTO meeting_slots (teacher_username, start_time, end_time, capacity, booked) VALUES (?, ?, ?, ?, 0)",
+                    (teacher_username, start, end, capacity)
+                )
+                last_end = end
+                added += 1
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        _slot_indexes.pop((db_path, teacher_username), None)
+    return added, skipped
+
+def get_teacher_slots(teacher_username, after=None, db_path="users.db"):
+    after = after or datetime.now().strftime(SLOT_TIME_FORMAT)
+    with closing(sqlite3.connect(db_path)) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT start_time, end_time, capacity, booked
+            FROM meeting_slots
+            WHERE teacher_username=? AND start_time >= ?
+            ORDER BY start_time
+            """,
+            (teacher_username, after)
+        )
+        return cursor.fetchall()
+
+def request_meeting(roll_no, teacher_username, preferred_date, db_path="users.db"):
+    """Create a meeting request, booking the teacher's next free slot.
+
+    Returns (status, meeting_date) where status is one of "duplicate" (a
+    pending request to this teacher already exists), "full" (no free slot
+    on or after the preferred date), "scheduled" or "requested" (the
+    teacher has no upcoming availability slots, so the preferred date is
+    kept).
+    A preferred date in the past is treated as now: only slots that have
+    not started yet are booked.
+    """
+    now = datetime.now()
+    requested_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    # Dates sort before any time on the same day, so "today" still finds today's later slots
+    earliest = max(str(preferred_date), now.strftime(SLOT_TIME_FORMAT))
+    preferred_date = max(str(preferred_date), now.strftime("%Y-%m-%d"))
+    with _index_lock, closing(sqlite3.connect(db_path, timeout=10)) as conn:
+        cursor = conn.cursor()
+        # Serialize bookings so two parents can't take the last place in a slot
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute(
+                "SELECT meeting_date FROM meeting_requests WHERE roll_no=? AND teacher_username=? AND status='Pending'",
+                (roll_no, teacher_username)
+            )
+            row = cursor.fetchone()
+            if row:
+                conn.rollback()
+                return "duplicate", row[0]
+
+            index = _get_slot_index(cursor, db_path, teacher_username)
+            # Only past slots (or none): treat it like a teacher without slots
+            if bisect_left(index.starts, earliest) == len(index):
+                cursor.execute(
+                    "INSERT INTO meeting_requests (roll_no, meeting_date, requested_at, status, teacher_username) VALUES (?, ?, ?, ?, ?)",
+                    (roll_no, str(preferred_date), requested_at, 'Pending', teacher_username)
+                )
+                conn.commit()
+                return "requested", str(preferred_date)
+
+            for attempt in range(2):
+                free = index.next_free(earliest)
+                if free is not None:
+                    slot_id, start = free
+                    cursor.execute(
+                        "UPDATE meeting_slots SET booked = booked + 1 WHERE id=? AND booked < capacity",
+                        (slot_id,)
+                    )
+                    if cursor.rowcount:
+                        break
+                # The cached index may be stale if another process changed
+                # bookings; we hold the write lock, so a reload is exact
+                index = _load_slot_index(cursor, teacher_username)
+                _slot_indexes[(db_path, teacher_username)] = index
+            else:
+                conn.rollback()
+                return "full", None
+
+            cursor.execute(
+                "INSERT INTO meeting_requests (roll_no, meeting_date, requested_at, status, teacher_username, slot_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (roll_no, start, requested_at, 'Pending', teacher_username, slot_id)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            _slot_indexes.pop((db_path, teacher_username), None)
+            raise
+        index.update(slot_id, -1)
+    return "scheduled", start
+
+def release_slots(cursor, request_ids):
+    """Give back the slot places held by rejected requests (caller commits)"""
+    placeholders = ", ".join("?" for _ in request_ids)
+    cursor.execute(
+        f"SELECT slot_id, teacher_username FROM meeting_requests WHERE id IN ({placeholders}) AND slot_id IS NOT NULL AND status != 'Rejected'",
+        [int(request_id) for request_id in request_ids]
+    )
+    rows = cursor.fetchall()
+    for slot_id, _ in rows:
+        cursor.execute(
+            "UPDATE meeting_slots SET booked = booked - 1 WHERE id=? AND booked > 0",
+            (slot_id,)
+        )
+    return {teacher_username for _, teacher_username in rows}
@@ -0,0 +1,194 @@
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+from tenancy import ShardRegistry
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT
+)
+"""
+
+def create_outbox(cursor):
+    cursor.execute(OUTBOX_SCHEMA)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+    ON notification_outbox (status, next_attempt_at)
+    """)
+
+def enqueue_notification(cursor, recipient, subject, body):
+    """Queue an email on the caller's cursor so it commits with the caller's change"""
+    now = datetime.now().strftime(TIME_FORMAT)
+    cursor.execute(
+        "INSERT INTO notification_outbox (recipient, subject, body, status, attempts, next_attempt_at, created_at) VALUES (?, ?, ?, 'pending', 0, ?, ?)",
+        (recipient, subject, body, now, now)
+    )
+
+class SmtpSender:
+    """Send emails over SMTP, one connection per batch.
+
+    Defaults to localhost:1025 so a local debugging server such as
+    `python -m aiosmtpd -n -l localhost:1025` prints mail instead of sending it.
+    """
+
+    def __init__(self, host="localhost", port=1025, sender="reports@school.local",
+                 username=None, password=None, starttls=False, timeout=10):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            host=os.environ.get("SMTP_HOST", "localhost"),
+            port=int(os.environ.get("SMTP_PORT", "1025")),
+            sender=os.environ.get("SMTP_FROM", "reports@school.local"),
+            username=os.environ.get("SMTP_USER"),
+            password=os.environ.get("SMTP_PASSWORD"),
+            starttls=os.environ.get("SMTP_STARTTLS", "0") == "1",
+        )
+
+    def send_batch(self, messages):
+        """Send (id, recipient, subject, body) messages, return {id: error or None}"""
+        results = {}
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for message_id, recipient, subject, body in messages:
+                email = EmailMessage()
+                email["From"] = self.sender
+                email["To"] = recipient
+                email["Subject"] = subject
+                email.set_content(body)
+                try:
+                    smtp.send_message(email)
+                    results[message_id] = None
+                except smtplib.SMTPException as e:
+                    results[message_id] = str(e)
+        return results
+
+class NotificationWorker(threading.Thread):
+    """Background thread that drains the outbox tables of the given databases.
+
+    db_paths is a list of paths or a callable returning one, so databases
+    added while the worker runs (new schools) are picked up.
+    """
+
+    def __init__(self, db_paths, sender, batch_size=50, poll_interval=5,
+                 max_attempts=5, retry_delay=30):
+        super().__init__(name="notification-worker", daemon=True)
+        self.db_paths = db_paths
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def wake(self):
+        """Drain now instead of waiting for the next poll"""
+        self._wake.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            sent_any = False
+            db_paths = self.db_paths() if callable(self.db_paths) else self.db_paths
+            for db_path in db_paths:
+                try:
+                    sent_any = self.drain_once(db_path) or sent_any
+                except sqlite3.Error:
+                    # Database busy or locked; try again on the next pass
+                    pass
+            # Keep going while there is a backlog, otherwise wait
+            if not sent_any:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def drain_once(self, db_path):
+        """Send one batch of due messages from db_path, return True if any were sent"""
+        now = datetime.now()
+        with closing(sqlite3.connect(db_path, timeout=10)) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, recipient, subject, body, attempts
+                FROM notification_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (now.strftime(TIME_FORMAT), self.batch_size)
+            )
+            batch = cursor.fetchall()
+            if not batch:
+                return False
+
+            try:
+                results = self.sender.send_batch([row[:4] for row in batch])
+            except (OSError, smtplib.SMTPException) as e:
+                # Connection level failure: the whole batch is retried
+                results = {row[0]: str(e) for row in batch}
+
+            sent_at = datetime.now().strftime(TIME_FORMAT)
+            with conn:
+                for message_id, _, _, _, attempts in batch:
+                    error = results.get(message_id, "not sent")
+                    if error is None:
+                        conn.execute(
+                            "UPDATE notification_outbox SET status='sent', sent_at=?, attempts=? WHERE id=?",
+                            (sent_at, attempts + 1, message_id)
+                        )
+                        continue
+                    attempts += 1
+                    # Exponential backoff: retry_delay, 2x, 4x, ...
+                    delay = timedelta(seconds=self.retry_delay * 2 ** (attempts - 1))
+                    conn.execute(
+                        "UPDATE notification_outbox SET status=?, attempts=?, next_attempt_at=?, last_error=? WHERE id=?",
+                        (
+                            "failed" if attempts >= self.max_attempts else "pending",
+                            attempts,
+                            (now + delay).strftime(TIME_FORMAT),
+                            error,
+                            message_id
+                        )
+                    )
+            return any(error is None for error in results.values())
+
+if __name__ == "__main__":
+    # Run the worker on its own; set NOTIFICATION_WORKER=external for the app
+    # processes so only this one drains the outbox
+    worker = NotificationWorker(ShardRegistry().users_db_paths, SmtpSender.from_env())
+    worker.start()
+    try:
+        while worker.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        worker.stop()
@@ -0,0 +1,185 @@
+import glob
+import os
+import re
+import sqlite3
+import tempfile
+from contextlib import closing
+from datetime import datetime
+
+SNAPSHOT_DIR = "published"
+CURRENT_POINTER = "CURRENT"
+
+# Same names as the columns get_student_report returns
+RESULT_COLUMNS = [
+    ("name", "Name"),
+    ("roll_no", "Roll No"),
+    ("class", "Class"),
+    ("section", "Section"),
+    ("tamil", "Tamil"),
+    ("english", "English"),
+    ("maths", "Maths"),
+    ("science", "Science"),
+    ("social", "Social"),
+    ("computer", "Computer"),
+    ("total", "Total"),
+    ("percentage", "Percentage"),
+    ("grade", "Grade"),
+    ("timestamp", "Date"),
+]
+
+# Columns of the report history frozen with each snapshot, for predictions
+HISTORY_COLUMNS = [
+    "id", "roll_no", "tamil", "english", "maths", "science", "social", "computer", "percentage", "timestamp",
+]
+
+def publish_term(term, reports_db="reports.db", snapshot_dir=SNAPSHOT_DIR, keep=5):
+    """Freeze each student's latest report, and their report history, into a
+    new read-only snapshot file.
+
+    Every publish writes a fresh file (snapshots are opened with immutable=1,
+    so an existing one must never change) and then atomically repoints
+    CURRENT at it. Only the newest `keep` snapshots are kept afterwards.
+    Returns (path, row_count).
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    published_at = datetime.now()
+    safe_term = re.sub(r"[^A-Za-z0-9_-]+", "_", term).strip("_") or "term"
+    # mkstemp reserves a unique name: two publishes in the same second must
+    # not end up writing the same file
+    fd, path = tempfile.mkstemp(
+        prefix=f"{safe_term}-{published_at.strftime('%Y%m%d%H%M%S')}-", suffix=".db", dir=snapshot_dir
+    )
+    os.close(fd)
+    path = os.path.join(snapshot_dir, os.path.basename(path))
+    tmp_path = path + ".tmp"
+    try:
+        row_count = write_snapshot(tmp_path, term, published_at, reports_db)
+    except Exception:
+        for leftover in (tmp_path, path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        raise
+
+    os.replace(tmp_path, path)
+    pointer_tmp = os.path.join(snapshot_dir, CURRENT_POINTER + ".tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(os.path.basename(path))
+    os.replace(pointer_tmp, os.path.join(snapshot_dir, CURRENT_POINTER))
+    prune_snapshots(snapshot_dir, keep)
+    return path, row_count
+
+def write_snapshot(tmp_path, term, published_at, reports_db):
+    """Build the snapshot tables in tmp_path from reports_db, return the result count"""
+    columns = ", ".join(col for col, _ in RESULT_COLUMNS)
+    with closing(sqlite3.connect(tmp_path)) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE published_results (
+            roll_no TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            class TEXT NOT NULL,
+            section TEXT NOT NULL,
+            tamil INTEGER NOT NULL,
+            english INTEGER NOT NULL,
+            maths INTEGER NOT NULL,
+            science INTEGER NOT NULL,
+            social INTEGER NOT NULL,
+            computer INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            grade TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+        CREATE TABLE published_history (
+            id INTEGER NOT NULL,
+            roll_no TEXT NOT NULL,
+            tamil INTEGER NOT NULL,
+            english INTEGER NOT NULL,
+            maths INTEGER NOT NULL,
+            science INTEGER NOT NULL,
+            social INTEGER NOT NULL,
+            computer INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            PRIMARY KEY (roll_no, id)
+        ) WITHOUT ROWID
+        """)
+        cursor.execute("CREATE TABLE snapshot_info (term TEXT NOT NULL, published_at TEXT NOT NULL, row_count INTEGER NOT NULL)")
+        cursor.execute("ATTACH DATABASE ? AS live", (reports_db,))
+        cursor.execute(f"""
+        INSERT INTO published_results ({columns})
+        SELECT {columns} FROM live.reports
+        WHERE id IN (SELECT MAX(id) FROM live.reports GROUP BY roll_no)
+        """)
+        row_count = cursor.rowcount
+        cursor.execute(f"""
+        INSERT INTO published_history ({', '.join(HISTORY_COLUMNS)})
+        SELECT {', '.join(HISTORY_COLUMNS)} FROM live.reports
+        """)
+        cursor.execute(
+            "INSERT INTO snapshot_info (term, published_at, row_count) VALUES (?, ?, ?)",
+            (term, published_at.strftime("%Y-%m-%d %H:%M:%S"), row_count)
+        )
+        conn.commit()
+        cursor.execute("DETACH DATABASE live")
+        cursor.execute("VACUUM")
+    return row_count
+
+def prune_snapshots(snapshot_dir=SNAPSHOT_DIR, keep=5):
+    """Delete all but the newest `keep` snapshots, never the current one; return the deleted paths"""
+    current = get_current_snapshot(snapshot_dir)
+    snapshots = sorted(glob.glob(os.path.join(snapshot_dir, "*.db")), key=os.path.getmtime, reverse=True)
+    removed = [
+        path for path in snapshots[keep:]
+        if current is None or os.path.abspath(path) != os.path.abspath(current)
+    ]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def unpublish(snapshot_dir=SNAPSHOT_DIR):
+    """Stop serving the snapshot; portals go back to live reports"""
+    pointer = os.path.join(snapshot_dir, CURRENT_POINTER)
+    if os.path.exists(pointer):
+        os.remove(pointer)
+
+def get_current_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Return the path of the published snapshot, or None"""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_POINTER), encoding="utf-8") as f:
+            filename = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(snapshot_dir, filename)
+    return path if os.path.exists(path) else None
+
+def load_snapshot(path):
+    """Load a snapshot into memory, returning (info, {roll_no: result})"""
+    uri = f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT term, published_at, row_count FROM snapshot_info")
+        term, published_at, row_count = cursor.fetchone()
+        cursor.execute(f"SELECT {', '.join(col for col, _ in RESULT_COLUMNS)} FROM published_results")
+        labels = [label for _, label in RESULT_COLUMNS]
+        results = {row[1]: dict(zip(labels, row)) for row in cursor}
+    info = {"term": term, "published_at": published_at, "row_count": row_count, "path": path}
+    return info, results
+
+def load_snapshot_history(path, roll_no):
+    """One student's report history as of publishing, oldest first.
+
+    Returns None for snapshots published before history was stored.
+    """
+    uri = f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(HISTORY_COLUMNS)} FROM published_history WHERE roll_no = ? ORDER BY timestamp, id",
+                (roll_no,)
+            )
+        except sqlite3.OperationalError:
+            return None
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in cursor]
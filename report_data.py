@@ -0,0 +1,122 @@
+from functools import lru_cache
+
+from export_reports import EXPORT_COLUMNS
+from published_results import RESULT_COLUMNS, load_snapshot
+
+MEETING_FIELDS = [
+    "id", "roll_no", "student_name", "meeting_date", "requested_at", "status", "teacher_notes",
+]
+
+# SQLite's default limit on bound variables is 999 on older builds
+MAX_BATCH = 500
+
+def fetch_student_report(shard, roll_no):
+    """Latest report of one student as a dict, or None"""
+    with shard.reports.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT {', '.join(EXPORT_COLUMNS)} FROM reports WHERE roll_no = ? ORDER BY timestamp DESC LIMIT 1",
+            (roll_no,)
+        )
+        row = cursor.fetchone()
+    return dict(zip(EXPORT_COLUMNS, row)) if row else None
+
+def latest_reports(cursor, roll_nos, columns=EXPORT_COLUMNS):
+    """Latest report of each student as {roll_no: dict of columns}, read on the caller's cursor.
+
+    Students without a report are left out.
+    """
+    roll_nos = list(dict.fromkeys(roll_nos))
+    reports = {}
+    for i in range(0, len(roll_nos), MAX_BATCH):
+        chunk = roll_nos[i:i + MAX_BATCH]
+        placeholders = ", ".join("?" for _ in chunk)
+        cursor.execute(f"""
+        SELECT r.roll_no, {', '.join(f"r.{column}" for column in columns)} FROM reports r
+        WHERE r.roll_no IN ({placeholders})
+        AND r.id = (
+            SELECT id FROM reports
+            WHERE roll_no = r.roll_no
+            ORDER BY timestamp DESC, id DESC
+            LIMIT 1
+        )
+        """, chunk)
+        for row in cursor:
+            reports[row[0]] = dict(zip(columns, row[1:]))
+    return reports
+
+def fetch_student_reports(shard, roll_nos):
+    """Latest report of each student as {roll_no: dict}; students without one are left out"""
+    with shard.reports.connection() as conn:
+        return latest_reports(conn.cursor(), roll_nos)
+
+@lru_cache(maxsize=16)
+def _published_reports(snapshot_path):
+    # Snapshot files never change once written, so the path is a safe key
+    _, results = load_snapshot(snapshot_path)
+    return {
+        roll_no: {column: result[label] for column, label in RESULT_COLUMNS}
+        for roll_no, result in results.items()
+    }
+
+def fetch_published_reports(snapshot_path, roll_nos):
+    """Published report of each student as {roll_no: dict}, read from a snapshot
+    held in memory. Published rows have no "id"; students without one are left out.
+    """
+    results = _published_reports(snapshot_path)
+    return {roll_no: results[roll_no] for roll_no in dict.fromkeys(roll_nos) if roll_no in results}
+
+def fetch_student_info(shard, roll_no):
+    with shard.users.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT roll_no, full_name, class, section FROM students WHERE roll_no=?",
+            (roll_no,)
+        )
+        row = cursor.fetchone()
+        if row:
+            return {
+                "roll_no": row[0],
+                "full_name": row[1],
+                "class": row[2],
+                "section": row[3]
+            }
+        return {}
+
+def fetch_meeting_requests(shard, teacher_username=None, status=None, exclude_status=None,
+                           limit=None, offset=0):
+    clauses = []
+    params = []
+    if teacher_username:
+        clauses.append("mr.teacher_username = ?")
+        params.append(teacher_username)
+    if status:
+        clauses.append("mr.status = ?")
+        params.append(status)
+    if exclude_status:
+        clauses.append("mr.status != ?")
+        params.append(exclude_status)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    page = ""
+    if limit is not None:
+        page = "LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+
+    with shard.users.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT
+                mr.id,
+                mr.roll_no,
+                s.full_name,
+                mr.meeting_date,
+                mr.requested_at,
+                mr.status,
+                mr.teacher_notes
+            FROM meeting_requests mr
+            JOIN students s ON mr.roll_no = s.roll_no
+            {where}
+            ORDER BY mr.requested_at DESC
+            {page}
+        """, params)
+        return [dict(zip(MEETING_FIELDS, row)) for row in cursor]
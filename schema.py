@@ -0,0 +1,146 @@
+import hashlib
+from datetime import datetime
+
+from marks_audit import create_marks_audit
+from notifications import create_outbox
+from tenancy import DEFAULT_SCHOOL
+
+def upgrade_database(shard):
+    """Handle database schema upgrades"""
+    with shard.users.connection() as conn:
+        cursor = conn.cursor()
+        
+        # Check if is_admin column exists in teachers table
+        cursor.execute("PRAGMA table_info(teachers)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'is_admin' not in columns:
+            # Add the column if it doesn't exist
+            cursor.execute("ALTER TABLE teachers ADD COLUMN is_admin BOOLEAN DEFAULT 0")
+            # Update existing admin account
+            cursor.execute(
+                "UPDATE teachers SET is_admin = 1 WHERE username = ?",
+                ("Lam",)
+            )
+            conn.commit()
+
+        # Check if slot_id column exists in meeting_requests table
+        cursor.execute("PRAGMA table_info(meeting_requests)")
+        columns = [col[1] for col in cursor.fetchall()]
+        if 'slot_id' not in columns:
+            cursor.execute("ALTER TABLE meeting_requests ADD COLUMN slot_id INTEGER")
+            conn.commit()
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_meeting_requests_slot ON meeting_requests (slot_id)")
+
+# Initialize databases
+def init_db(shard):
+    with shard.reports.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            roll_no TEXT NOT NULL,
+            class TEXT NOT NULL,
+            section TEXT NOT NULL,
+            tamil INTEGER NOT NULL,
+            english INTEGER NOT NULL,
+            maths INTEGER NOT NULL,
+            science INTEGER NOT NULL,
+            social INTEGER NOT NULL,
+            computer INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            grade TEXT NOT NULL,
+            timestamp TEXT NOT NULL
+        )
+        """)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reports_class_section
+        ON reports (class, section)
+        """)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reports_roll_no_timestamp
+        ON reports (roll_no, timestamp)
+        """)
+        create_marks_audit(cursor)
+        conn.commit()
+    
+    with shard.users.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS teachers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT 0
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            roll_no TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            full_name TEXT NOT NULL,
+            class TEXT NOT NULL,
+            section TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS parent_accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_roll_no TEXT UNIQUE NOT NULL,
+            parent_email TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            FOREIGN KEY(student_roll_no) REFERENCES students(roll_no)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meeting_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            roll_no TEXT NOT NULL,
+            meeting_date TEXT NOT NULL,
+            requested_at TEXT NOT NULL,
+            status TEXT DEFAULT 'Pending',
+            teacher_notes TEXT,
+            approval_timestamp TEXT,
+            teacher_username TEXT,
+            slot_id INTEGER
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS meeting_slots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            teacher_username TEXT NOT NULL,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            capacity INTEGER NOT NULL DEFAULT 1,
+            booked INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        create_outbox(cursor)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_meeting_slots_teacher_start
+        ON meeting_slots (teacher_username, start_time)
+        """)
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_meeting_requests_teacher_status
+        ON meeting_requests (teacher_username, status, requested_at)
+        """)
+        # Only the original school gets the built-in admin; schools added
+        # from the Schools tab are created with an admin of their own
+        cursor.execute("SELECT 1 FROM teachers WHERE username=?", ("Lam",))
+        if shard.school_id == DEFAULT_SCHOOL and not cursor.fetchone():
+            hashed_password = hashlib.sha256("Lam123".encode()).hexdigest()
+            cursor.execute(
+                "INSERT INTO teachers (username, password, full_name, created_at, is_admin) VALUES (?, ?, ?, ?, ?)",
+                ("Lam", hashed_password, "Admin Teacher", datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 1)
+            )
+            conn.commit()
+
+# Initialize database and handle upgrades
+def init_shard(shard):
+    init_db(shard)
+    upgrade_database(shard)
@@ -0,0 +1,74 @@
+from bisect import bisect_left
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class StudentSearchIndex:
+    """In-memory prefix and trigram index over (roll_no, full_name, class, section) rows.
+
+    Prefix lookups bisect a sorted list of roll numbers and name words, so
+    "12" or "pri" find "1203" or "Priya Kumar" without scanning every
+    student. Queries of three or more characters also match anywhere inside
+    a roll number or name through the trigram postings.
+    """
+
+    def __init__(self, students):
+        self.students = sorted(students, key=lambda s: (s[2], s[3], s[0]))
+        self.classes = sorted({s[2] for s in self.students})
+        self.sections = sorted({s[3] for s in self.students})
+        keys = []
+        self.postings = {}
+        for i, (roll_no, full_name, _, _) in enumerate(self.students):
+            roll_key = str(roll_no).lower()
+            name_key = full_name.lower()
+            keys.append((roll_key, i))
+            keys.append((name_key, i))
+            for word in name_key.split()[1:]:
+                keys.append((word, i))
+            for gram in trigrams(roll_key) | trigrams(name_key):
+                self.postings.setdefault(gram, set()).add(i)
+        keys.sort()
+        self.keys = [k for k, _ in keys]
+        self.key_rows = [i for _, i in keys]
+
+    def __len__(self):
+        return len(self.students)
+
+    def _matches_filter(self, i, class_name, section):
+        student = self.students[i]
+        return (not class_name or student[2] == class_name) and (not section or student[3] == section)
+
+    def search(self, query, class_name=None, section=None, limit=20):
+        """Return up to `limit` students matching query, prefix matches first"""
+        query = query.strip().lower()
+        if not query:
+            rows = (i for i in range(len(self.students)) if self._matches_filter(i, class_name, section))
+            return [self.students[i] for _, i in zip(range(limit), rows)]
+
+        found = []
+        seen = set()
+        pos = bisect_left(self.keys, query)
+        while pos < len(self.keys) and self.keys[pos].startswith(query) and len(found) < limit:
+            i = self.key_rows[pos]
+            if i not in seen and self._matches_filter(i, class_name, section):
+                seen.add(i)
+                found.append(i)
+            pos += 1
+
+        if len(found) < limit and len(query) >= 3:
+            grams = sorted(trigrams(query), key=lambda g: len(self.postings.get(g, ())))
+            candidates = set(self.postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                candidates &= self.postings.get(gram, set())
+                if not candidates:
+                    break
+            for i in sorted(candidates - seen):
+                roll_no, full_name, _, _ = self.students[i]
+                # Trigrams can match out of order, so confirm the substring
+                if (query in str(roll_no).lower() or query in full_name.lower()) \
+                        and self._matches_filter(i, class_name, section):
+                    found.append(i)
+                    if len(found) >= limit:
+                        break
+
+        return [self.students[i] for i in found]
@@ -0,0 +1,186 @@
+import os
+import queue
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SCHOOLS_DIR = "schools"
+# The default school keeps the original users.db/reports.db in the app folder
+DEFAULT_SCHOOL = "default"
+
+SCHOOL_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# School of the code currently running; copied into prefetch threads
+current_school = ContextVar("current_school", default=DEFAULT_SCHOOL)
+
+def valid_school_id(school_id):
+    return bool(SCHOOL_ID_PATTERN.match(school_id or ""))
+
+def school_root(school_id, schools_dir=SCHOOLS_DIR):
+    if school_id == DEFAULT_SCHOOL:
+        return "."
+    if not valid_school_id(school_id):
+        raise ValueError(f"Invalid school id: {school_id!r}")
+    return os.path.join(schools_dir, school_id)
+
+class ConnectionPool:
+    """Small pool of SQLite connections to one database file"""
+
+    def __init__(self, path, size=8, timeout=10):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        return self._idle.get(timeout=self.timeout)
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            # Same as closing an uncommitted connection
+            conn.rollback()
+        if self.closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Close idle connections; ones in use are closed when returned"""
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class Shard:
+    """One school's database pair and their connection pools"""
+
+    def __init__(self, school_id, schools_dir=SCHOOLS_DIR, pool_size=8):
+        self.school_id = school_id
+        self.root = school_root(school_id, schools_dir)
+        os.makedirs(self.root, exist_ok=True)
+        self.users_path = os.path.join(self.root, "users.db")
+        self.reports_path = os.path.join(self.root, "reports.db")
+        self.users = ConnectionPool(self.users_path, pool_size)
+        self.reports = ConnectionPool(self.reports_path, pool_size)
+
+    def path(self, *parts):
+        """Path of a per-school file or folder (snapshots, archives, ...)"""
+        return os.path.join(self.root, *parts)
+
+    def close(self):
+        self.users.close()
+        self.reports.close()
+
+class ShardRegistry:
+    """LRU of open shards; on_open(shard) runs once per school (schema setup)"""
+
+    def __init__(self, schools_dir=SCHOOLS_DIR, max_open=16, pool_size=8, on_open=None):
+        self.schools_dir = schools_dir
+        self.max_open = max_open
+        self.pool_size = pool_size
+        self.on_open = on_open
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+        self._opened = set()
+        self._open_locks = {}
+
+    def _open(self, school_id):
+        """A new Shard whose on_open has run; only blocks others opening the same school"""
+        with self._lock:
+            open_lock = self._open_locks.setdefault(school_id, threading.Lock())
+        with open_lock:
+            shard = Shard(school_id, self.schools_dir, self.pool_size)
+            if self.on_open and school_id not in self._opened:
+                try:
+                    self.on_open(shard)
+                except Exception:
+                    shard.close()
+                    raise
+                self._opened.add(school_id)
+            return shard
+
+    def get(self, school_id=None):
+        school_id = school_id or current_school.get()
+        with self._lock:
+            shard = self._shards.get(school_id)
+            if shard is not None:
+                self._shards.move_to_end(school_id)
+                return shard
+        shard = self._open(school_id)
+        with self._lock:
+            existing = self._shards.get(school_id)
+            if existing is not None:
+                # Another thread opened it meanwhile; keep theirs
+                shard.close()
+                self._shards.move_to_end(school_id)
+                return existing
+            self._shards[school_id] = shard
+            while len(self._shards) > self.max_open:
+                _, evicted = self._shards.popitem(last=False)
+                evicted.close()
+            return shard
+
+    def list_schools(self):
+        schools = [DEFAULT_SCHOOL]
+        if os.path.isdir(self.schools_dir):
+            schools += sorted(
+                name for name in os.listdir(self.schools_dir)
+                if name != DEFAULT_SCHOOL and valid_school_id(name)
+                and os.path.isdir(os.path.join(self.schools_dir, name))
+            )
+        return schools
+
+    def users_db_paths(self):
+        """users.db of every school (where the notification outbox lives), without opening shards"""
+        return [os.path.join(school_root(school_id, self.schools_dir), "users.db") for school_id in self.list_schools()]
+
+    def fan_out(self, func, school_ids=None, max_workers=8):
+        """Run func(shard) for every school in parallel, return {school_id: result}.
+
+        A school whose query fails maps to the exception instead of a result.
+        Schools that are not open get a temporary shard, so a scan over every
+        school doesn't evict the shards active sessions are using.
+        """
+        school_ids = school_ids or self.list_schools()
+
+        def run(school_id):
+            with self._lock:
+                shard = self._shards.get(school_id)
+            temporary = shard is None
+            try:
+                if temporary:
+                    shard = self._open(school_id)
+                return func(shard)
+            except Exception as e:
+                return e
+            finally:
+                if temporary and shard is not None:
+                    shard.close()
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(school_ids))) as pool:
+            return dict(zip(school_ids, pool.map(run, school_ids)))